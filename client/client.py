@@ -4,22 +4,63 @@ from argparse import ArgumentParser
 import eventlet
 from socketio import Client
 
+from wire import pack_command, unpack_turn
+
 HOST = 'localhost'
 PORT = 5050
 
 sio = Client(logger=True)
+# turns by stream: the seat name of a seat's own turns, None for the turns of the room
+games = {}
+binary = False
 
 
 def norm_cmd(command_str: str):
     return re.sub(' +', ' ', command_str.strip())
 
 
+def apply_turn(data) -> bool:
+    game = games.setdefault(data['stream'], {})
+    if data['full']:
+        game.clear()
+        game.update(data)
+        return True
+
+    if game.get('seq') != data['seq'] - 1:
+        return False
+
+    for location, piece in data['route']:
+        game['route'][location] = piece
+    for index, location, piece in data['homes']:
+        game['homes'][index][location] = piece
+    for key in ('seq', 'dice_values', 'current_player', 'legal_actions', 'observation'):
+        game[key] = data[key]
+    return True
+
+
 @sio.on('turn')
 def get_turn(data):
-    print('Dices:', data['dice_values'])
-    print('Homes:', data['homes'])
-    print('Nests:', data['nests'])
-    print('Route:', data['route'])
+    if isinstance(data, bytes):
+        turn = unpack_turn(data)
+        print('Turn:', turn['turn'], 'Dices:', turn['dice_values'])
+        print('Homes:', turn['homes'])
+        print('Places:', turn['places'])
+        print('Route:', turn['route'])
+        print('Legal actions:', turn['legal_actions'])
+        return
+
+    if not apply_turn(data):
+        games.pop(data['stream'], None)
+        sio.emit('resync', callback=on_status)
+        return
+
+    game = games[data['stream']]
+    print('Current player:', game['current_player'])
+    print('Dices:', game['dice_values'])
+    print('Homes:', game['homes'])
+    print('Nests:', game['nests'])
+    print('Route:', game['route'])
+    print('Legal actions:', game['legal_actions'])
 
 
 @sio.on('status')
@@ -43,16 +84,27 @@ def cli(username):
 
         command_name = parts[0]
         if command_name == 'list-room':
-            sio.emit('list_room', callback=on_list_room_result)
+            query = {'prefix': parts[1]} if len(parts) > 1 else None
+            sio.emit('list_room', data=query, callback=on_list_room_result)
         elif command_name == 'join-room':
             room_name = parts[-1]
             sio.emit('join_room', data=room_name, callback=on_status)
+        elif command_name == 'spectate':
+            room_name = parts[-1]
+            sio.emit('spectate', data=room_name, callback=on_status)
         elif command_name == 'leave-room':
             sio.emit('leave_room', callback=on_status)
         elif command_name == 'ready':
             sio.emit('ready', callback=on_status)
+        elif command_name == 'add-bot':
+            sio.emit('add_bot', callback=on_status)
         elif command_name == 'quit' or command_name == 'exit':
             break
+        elif binary:
+            try:
+                sio.emit('command', data=pack_command(command_str), callback=on_status)
+            except ValueError:
+                print(f'Invalid command "{command_str}"')
         else:
             sio.emit('command', data=command_str, callback=on_status)
 
@@ -60,11 +112,14 @@ def cli(username):
 if __name__ == '__main__':
     parser = ArgumentParser()
     parser.add_argument('username', type=str)
+    parser.add_argument('--binary', action='store_true', help='receive turns and send commands as packed bytes')
     args = parser.parse_args()
+    binary = args.binary
 
     url = f'http://{HOST}:{PORT}'
     sid = sio.connect(url, auth={
-        'username': args.username
+        'username': args.username,
+        'protocol': 'binary' if binary else 'json',
     })
 
     sio.start_background_task(cli, args.username)
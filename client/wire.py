@@ -0,0 +1,72 @@
+import struct
+from typing import Dict, List
+
+# Client side of the binary protocol of server/wire.py, selected with auth={'protocol': 'binary'}
+
+HEADER = struct.Struct('<BBBBIBBBHH')
+OPS = ('move', 'start', 'move-home', 'pass')
+NO_ACTION_CODE = 0xFF
+
+
+def unpack_turn(data: bytes) -> Dict:
+    version, num_players, lane_size, home_size, turn, current_index, dice_0, dice_1, num_legal, seat_size = \
+        HEADER.unpack_from(data)
+    body_start = HEADER.size + seat_size
+    route_size = num_players * lane_size
+    home_cells = num_players * home_size
+    legal_start = len(data) - 2 * num_legal
+    num_places = legal_start - body_start - route_size - home_cells
+    cells = struct.unpack_from(f'<{route_size + home_cells}b{num_places}B', data, body_start)
+    return {
+        'stream': data[HEADER.size:body_start].decode(),
+        'turn': turn,
+        'current_player': current_index,
+        'dice_values': [dice for dice in (dice_0, dice_1) if dice > 0],
+        'route': list(cells[:route_size]),
+        'homes': [list(cells[route_size + i * home_size:route_size + (i + 1) * home_size]) for i in range(num_players)],
+        'places': list(cells[route_size + home_cells:]),
+        'legal_actions': [format_actions(data[i:i + 2]) for i in range(legal_start, len(data), 2)],
+    }
+
+
+def format_actions(data: bytes) -> str:
+    commands = []
+    for code in data:
+        if code == NO_ACTION_CODE:
+            continue
+        op = OPS[code >> 5]
+        if op == 'pass':
+            commands.append(op)
+        elif op == 'start':
+            commands.append(f'{op} {code & 7}')
+        else:
+            commands.append(f'{op} {code >> 3 & 3} {code & 7}')
+    return ';'.join(commands)
+
+
+def pack_command(command_str: str) -> bytes:
+    '''
+    Action codes of a text command such as "move 1 3;start 6", raises ValueError when it is malformed
+    '''
+    codes: List[int] = []
+    for cmd in command_str.split(';'):
+        parts = cmd.split()
+        if parts in (['p'], ['pass']):
+            codes.append(OPS.index('pass') << 5)
+        elif len(parts) == 2 and parts[0] == 'start':
+            codes.append(OPS.index('start') << 5 | _field(parts[1], 1, 6))
+        elif len(parts) == 3 and parts[0] in ('move', 'move-home'):
+            codes.append(OPS.index(parts[0]) << 5 | _field(parts[1], 0, 3) << 3 | _field(parts[2], 1, 6))
+        else:
+            raise ValueError(cmd)
+    if len(codes) > 2:
+        raise ValueError(command_str)
+    return bytes(codes + [NO_ACTION_CODE] * (2 - len(codes)))
+
+
+def _field(text: str, low: int, high: int) -> int:
+    # out of range values would pack as another valid action
+    value = int(text)
+    if not low <= value <= high:
+        raise ValueError(text)
+    return value
@@ -0,0 +1,129 @@
+from functools import lru_cache
+from typing import Dict, Iterable, Tuple, Union
+
+from exception import InvalidCommandException
+
+
+__all__ = [
+    'Action', 'OP_MOVE', 'OP_START', 'OP_MOVE_HOME', 'OP_PASS', 'PASS', 'NO_ACTION_CODE',
+    'compile_command', 'format_actions', 'pack_actions', 'parse_actions', 'unpack_actions',
+]
+
+OP_MOVE = 'move'
+OP_START = 'start'
+OP_MOVE_HOME = 'move-home'
+OP_PASS = 'pass'
+
+# (op, piece index, steps), -1 where the op takes no piece or steps
+Action = Tuple[str, int, int]
+PASS: Action = (OP_PASS, -1, -1)
+
+# one byte per action: op << 5 | piece << 3 | steps
+OPS = (OP_MOVE, OP_START, OP_MOVE_HOME, OP_PASS)
+NO_ACTION_CODE = 0xFF
+
+
+def _parse_action(cmd: str) -> Action:
+    parts = cmd.split()
+    if not parts:
+        raise InvalidCommandException(cmd)
+
+    op = parts[0]
+    try:
+        if op == OP_MOVE or op == OP_MOVE_HOME:
+            return (op, int(parts[1]), int(parts[2]))
+        if op == OP_START:
+            return (op, -1, int(parts[1]))
+    except (ValueError, IndexError):
+        raise InvalidCommandException(cmd)
+
+    if op == OP_PASS or (op == 'p' and len(parts) == 1):
+        return PASS
+    raise InvalidCommandException(cmd)
+
+
+@lru_cache(maxsize=4096)
+def parse_actions(command_str: str) -> Tuple[Action, ...]:
+    '''
+    Actions of a text command such as "move 1 3;start 6", parsed once per distinct string
+    '''
+    return tuple(_parse_action(cmd) for cmd in command_str.split(';'))
+
+
+def _action_from_dict(action: Dict) -> Action:
+    try:
+        op = action['op']
+        if op == OP_MOVE or op == OP_MOVE_HOME:
+            piece, steps = action['piece'], action['steps']
+        elif op == OP_START:
+            piece, steps = -1, action['steps']
+        elif op == OP_PASS:
+            return PASS
+        else:
+            raise InvalidCommandException(str(action))
+    except (KeyError, TypeError):
+        raise InvalidCommandException(str(action))
+
+    if type(piece) is not int or type(steps) is not int:
+        raise InvalidCommandException(str(action))
+    return (op, piece, steps)
+
+
+def pack_actions(actions: Iterable[Action]) -> bytes:
+    '''
+    Fixed width binary form of a command of at most two actions, the missing one being NO_ACTION_CODE
+    '''
+    codes = [OPS.index(op) << 5 | (max(piece, 0) & 3) << 3 | (max(steps, 0) & 7) for op, piece, steps in actions]
+    return bytes(codes + [NO_ACTION_CODE] * (2 - len(codes)))
+
+
+@lru_cache(maxsize=1024)
+def unpack_actions(data: bytes) -> Tuple[Action, ...]:
+    actions = []
+    for code in data:
+        if code == NO_ACTION_CODE:
+            continue
+        if code >> 5 >= len(OPS):
+            raise InvalidCommandException(data.hex())
+
+        op = OPS[code >> 5]
+        if op == OP_PASS:
+            actions.append(PASS)
+        elif op == OP_START:
+            actions.append((op, -1, code & 7))
+        else:
+            actions.append((op, code >> 3 & 3, code & 7))
+    if not actions:
+        raise InvalidCommandException(data.hex())
+    return tuple(actions)
+
+
+def compile_command(command: Union[str, bytes, Dict, Iterable[Dict]]) -> Tuple[Action, ...]:
+    '''
+    Actions of a command given as text, as packed action codes, as one structured action
+    {"op", "piece", "steps"} or as a list of structured actions
+    '''
+    if isinstance(command, str):
+        return parse_actions(command)
+    if isinstance(command, bytes):
+        return unpack_actions(command)
+    if isinstance(command, dict):
+        return (_action_from_dict(command),)
+    if isinstance(command, (list, tuple)) and command:
+        return tuple(_action_from_dict(action) for action in command)
+    raise InvalidCommandException(str(command))
+
+
+def format_actions(actions: Iterable[Action]) -> str:
+    '''
+    Normalized text of actions, as listed in legal actions
+    '''
+    def format_action(action: Action) -> str:
+        op, piece, steps = action
+        if op == OP_PASS:
+            return OP_PASS
+        if op == OP_START:
+            return f'{op} {steps}'
+        return f'{op} {piece} {steps}'
+
+    return ';'.join(format_action(action) for action in actions)
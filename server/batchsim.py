@@ -0,0 +1,253 @@
+import time
+from typing import List, Optional
+
+import numpy as np
+
+from dice import new_seed
+from error import CannotMoveError, InvalidDiceError, NoError
+from gamestate import GameState
+from objects.board import Board
+from objects.nest import Nest
+from objects.piece import Piece
+
+
+class BatchGameState:
+    '''
+    Games played in lockstep as rows of NumPy arrays, with the rules of GameState
+    '''
+
+    OP_MOVE = 0
+    OP_START = 1
+    OP_MOVE_HOME = 2
+    OP_PASS = 3
+
+    EMPTY = -1
+    HOME_SIZE = 6
+    MAX_PIECES = Nest.MAX_PIECES
+
+    def __init__(self, num_games: int, num_players: int = 2, lane_size: int = GameState.PLAYER_LANE_SIZE,
+                 seed: Optional[int] = None) -> None:
+        self.num_games = num_games
+        self.num_players = num_players
+        self.lane_size = lane_size
+        self.route_size = num_players * lane_size
+
+        self.offsets = np.arange(num_players) * lane_size
+        entrances = self.offsets - 1
+        # Route.norm_location(-1) wraps to route_size - 2
+        self.entrances = np.where(entrances < 0, entrances + self.route_size - 1, entrances)
+
+        # piece ids (player * MAX_PIECES + index) or EMPTY
+        self.route = np.empty((num_games, self.route_size), dtype=np.int8)
+        # piece indexes or EMPTY
+        self.homes = np.empty((num_games, num_players, self.HOME_SIZE), dtype=np.int8)
+        self.places = np.empty((num_games, num_players, self.MAX_PIECES), dtype=np.int8)
+        # on the board given by places, Board.LOC_OUT_BOARD in nest or once captured
+        self.locations = np.empty((num_games, num_players, self.MAX_PIECES), dtype=np.int16)
+        self.current = np.empty(num_games, dtype=np.int8)
+        self.dices = np.empty((num_games, 2), dtype=np.int8)
+        self.turn = np.empty(num_games, dtype=np.int64)
+        # one generator for every game, dices of all games are drawn in a single call
+        self.seed = new_seed() if seed is None else seed
+        self.dice_rng = np.random.default_rng(self.seed)
+        self.reset()
+
+    def reset(self, games=None):
+        if games is None:
+            games = np.arange(self.num_games)
+        self.route[games] = self.EMPTY
+        self.homes[games] = self.EMPTY
+        self.places[games] = Piece.PLACE_NEST
+        self.locations[games] = Board.LOC_OUT_BOARD
+        self.current[games] = 0
+        self.turn[games] = 0
+        self.roll_dice(games)
+
+    def roll_dice(self, games=None):
+        if games is None:
+            games = np.arange(self.num_games)
+        self.dices[games] = self.dice_rng.integers(1, 7, size=(len(games), 2), dtype=np.int8)
+
+    def is_done(self) -> np.ndarray:
+        return (self.homes[:, :, -4:] != self.EMPTY).all(axis=2).any(axis=1)
+
+    def winner(self) -> np.ndarray:
+        '''
+        Winning player index per game, -1 for unfinished games
+        '''
+        finished = (self.homes[:, :, -4:] != self.EMPTY).all(axis=2)
+        return np.where(finished.any(axis=1), finished.argmax(axis=1), -1)
+
+    def step(self, ops: np.ndarray, pieces: np.ndarray, steps: np.ndarray) -> np.ndarray:
+        '''
+        Apply one action per game for its current player, return the status code per game.
+        Games with a successful action move on to the next player with new dices.
+        '''
+        ops = np.asarray(ops)
+        pieces = np.asarray(pieces)
+        steps = np.asarray(steps)
+
+        has_dice = (self.dices == steps[:, None]).any(axis=1)
+        status = np.where(has_dice, CannotMoveError.code, InvalidDiceError.code).astype(np.int8)
+        status[ops == self.OP_PASS] = NoError.code
+
+        games = np.flatnonzero(has_dice & (ops != self.OP_PASS))
+        players = self.current[games].astype(np.intp)
+        pieces = pieces[games]
+        steps = steps[games]
+        ops = ops[games]
+        places = self.places[games, players, pieces]
+
+        is_move = ops == self.OP_MOVE
+        self._move_route(status, games, players, pieces, steps, is_move & (places == Piece.PLACE_ROUTE))
+        self._move_in_home(status, games, players, pieces, steps, is_move & (places == Piece.PLACE_HOME))
+        self._move_to_home(status, games, players, pieces, steps,
+                           (ops == self.OP_MOVE_HOME) & (places == Piece.PLACE_ROUTE))
+        self._start(status, games, players, steps, ops == self.OP_START)
+
+        succeeded = np.flatnonzero(status == NoError.code)
+        self.current[succeeded] = (self.current[succeeded] + 1) % self.num_players
+        self.turn[succeeded] += 1
+        self.roll_dice(succeeded)
+        return status
+
+    def _capture(self, games, occupants):
+        # the captured piece keeps PLACE_ROUTE but is no longer on the board, as in Board.set_location
+        captured = occupants != self.EMPTY
+        occupants = occupants[captured]
+        self.locations[games[captured], occupants // self.MAX_PIECES, occupants % self.MAX_PIECES] = Board.LOC_OUT_BOARD
+
+    def _move_route(self, status, games, players, pieces, steps, mask):
+        games, players, pieces, steps = games[mask], players[mask], pieces[mask], steps[mask]
+        size = self.route_size
+        old = self.locations[games, players, pieces].astype(np.intp)
+        on_board = old != Board.LOC_OUT_BOARD
+        games, players, pieces, steps, old = games[on_board], players[on_board], pieces[on_board], \
+            steps[on_board], old[on_board]
+
+        new = (old + steps) % size
+        first = (old + 1) % size
+        last = np.where(new > 0, new - 1, size - 2)
+        occupied = np.zeros((len(games), size + 1), dtype=np.int16)
+        np.cumsum(self.route[games] != self.EMPTY, axis=1, out=occupied[:, 1:])
+        rows = np.arange(len(games))
+        count = np.where(first <= last,
+                         occupied[rows, last + 1] - occupied[rows, first],
+                         occupied[rows, size] - occupied[rows, first] + occupied[rows, last + 1])
+        is_clear = count == 0
+
+        occupants = self.route[games, new]
+        is_same_player = (occupants != self.EMPTY) & (occupants // self.MAX_PIECES == players)
+
+        # Route.is_pass_home_entrance
+        offsets = self.offsets[players]
+        entrances = self.entrances[players]
+        relative = np.where(old < offsets, old + offsets, old - offsets)
+        entrances = np.where(offsets > entrances, entrances + size - offsets, entrances)
+        is_pass_home = relative + steps > entrances
+
+        ok = is_clear & ~is_same_player & ~is_pass_home
+        games, players, pieces, old, new = games[ok], players[ok], pieces[ok], old[ok], new[ok]
+        self._capture(games, occupants[ok])
+        self.route[games, old] = self.EMPTY
+        self.route[games, new] = players * self.MAX_PIECES + pieces
+        self.locations[games, players, pieces] = new
+        status[games] = NoError.code
+
+    def _move_in_home(self, status, games, players, pieces, steps, mask):
+        games, players, pieces, steps = games[mask], players[mask], pieces[mask], steps[mask]
+        old = self.locations[games, players, pieces]
+        ok = (old == steps - 2) & (self.homes[games, players, steps - 1] == self.EMPTY)
+        games, players, pieces, steps, old = games[ok], players[ok], pieces[ok], steps[ok], old[ok]
+        self.homes[games, players, old] = self.EMPTY
+        self.homes[games, players, steps - 1] = pieces
+        self.locations[games, players, pieces] = steps - 1
+        status[games] = NoError.code
+
+    def _move_to_home(self, status, games, players, pieces, steps, mask):
+        games, players, pieces, steps = games[mask], players[mask], pieces[mask], steps[mask]
+        old = self.locations[games, players, pieces]
+        occupied = np.zeros((len(games), self.HOME_SIZE + 1), dtype=np.int8)
+        np.cumsum(self.homes[games, players] != self.EMPTY, axis=1, out=occupied[:, 1:])
+        ok = (old == self.entrances[players]) & (occupied[np.arange(len(games)), steps] == 0)
+        games, players, pieces, steps, old = games[ok], players[ok], pieces[ok], steps[ok], old[ok]
+        self.route[games, old] = self.EMPTY
+        self.homes[games, players, steps - 1] = pieces
+        self.places[games, players, pieces] = Piece.PLACE_HOME
+        self.locations[games, players, pieces] = steps - 1
+        status[games] = NoError.code
+
+    def _start(self, status, games, players, steps, mask):
+        mask = mask & ((steps == 1) | (steps == 6))
+        games, players = games[mask], players[mask]
+        in_nest = self.places[games, players] == Piece.PLACE_NEST
+        doors = self.offsets[players]
+        occupants = self.route[games, doors]
+        is_same_player = (occupants != self.EMPTY) & (occupants // self.MAX_PIECES == players)
+        ok = in_nest.any(axis=1) & ~is_same_player
+        games, players, doors, occupants = games[ok], players[ok], doors[ok], occupants[ok]
+        pieces = in_nest[ok].argmax(axis=1)
+        self._capture(games, occupants)
+        self.route[games, doors] = players * self.MAX_PIECES + pieces
+        self.places[games, players, pieces] = Piece.PLACE_ROUTE
+        self.locations[games, players, pieces] = doors
+        status[games] = NoError.code
+
+
+def cross_check(num_games: int = 64, num_steps: int = 2000, num_players: int = 2):
+    '''
+    Play the same random actions on BatchGameState and on GameState objects, assert both end up identical
+    '''
+    batch = BatchGameState(num_games, num_players)
+    states: List[GameState] = []
+    for _ in range(num_games):
+        state = GameState()
+        state.reset(num_players)
+        states.append(state)
+
+    commands = {
+        BatchGameState.OP_MOVE: 'move {piece} {steps}',
+        BatchGameState.OP_START: 'start {steps}',
+        BatchGameState.OP_MOVE_HOME: 'move-home {piece} {steps}',
+    }
+    for _ in range(num_steps):
+        # new dices every step so that games do not get stuck on an unplayable roll
+        batch.roll_dice()
+        for state, dices in zip(states, batch.dices.tolist()):
+            state.set_dices(dices)
+
+        ops = np.random.randint(0, 3, size=num_games)
+        pieces = np.random.randint(0, BatchGameState.MAX_PIECES, size=num_games)
+        steps = np.where(np.random.rand(num_games) < 0.9,
+                         batch.dices[np.arange(num_games), np.random.randint(0, 2, size=num_games)],
+                         np.random.randint(1, 7, size=num_games))
+        codes = batch.step(ops, pieces, steps)
+        dones = batch.is_done()
+
+        for i, state in enumerate(states):
+            status, done = state.step(commands[ops[i]].format(piece=pieces[i], steps=steps[i]))
+            assert status.code == codes[i], (i, ops[i], pieces[i], steps[i], status, codes[i])
+            assert done == dones[i]
+            current, _, _, route, homes, places = state.snapshot()
+            assert route == tuple(batch.route[i].tolist())
+            assert homes == tuple(map(tuple, batch.homes[i].tolist()))
+            assert places == tuple(batch.places[i].ravel().tolist())
+            assert current == batch.current[i]
+
+
+def benchmark(num_games: int = 4096, num_steps: int = 1000, num_players: int = 2):
+    batch = BatchGameState(num_games, num_players)
+    start = time.perf_counter()
+    for _ in range(num_steps):
+        ops = np.random.randint(0, 4, size=num_games)
+        pieces = np.random.randint(0, BatchGameState.MAX_PIECES, size=num_games)
+        steps = batch.dices[np.arange(num_games), np.random.randint(0, 2, size=num_games)]
+        batch.step(ops, pieces, steps)
+    elapsed = time.perf_counter() - start
+    return num_games * num_steps / elapsed
+
+
+if __name__ == '__main__':
+    for num_players in range(2, GameState.MAX_NUM_PLAYER + 1):
+        cross_check(num_players=num_players)
+        print(f'{num_players} players: cross-check OK, {benchmark(num_players=num_players):.0f} moves/s')
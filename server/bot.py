@@ -0,0 +1,238 @@
+import math
+import random
+import threading
+import time
+from multiprocessing import Pool
+from typing import Dict, List, Optional
+
+import eventlet
+import numpy as np
+from eventlet import tpool
+
+from connection import Connection
+from gamestate import GameState
+from objects.piece import Piece
+
+
+# headless states reused across rollouts, one per thread as searches may run in several tpool threads
+_simulations = threading.local()
+
+
+def _simulation(snapshot: tuple) -> GameState:
+    num_players = len(snapshot[4])
+    state = getattr(_simulations, 'state', None)
+    if state is None or len(state.players) != num_players:
+        state = _simulations.state = GameState()
+        state.reset(num_players)
+    state.restore(snapshot)
+    return state
+
+
+def _init_worker():
+    # forked workers would otherwise replay the same dices and moves
+    random.seed()
+    np.random.seed()
+
+
+def evaluate(state: GameState) -> List[float]:
+    '''
+    Reward of every player: 1 for the winner, otherwise a share by pieces progress
+    '''
+    winner = state.winner()
+    if winner is not None:
+        return [float(player == winner) for player in state.players]
+
+    scores = []
+    for nest in state.nests:
+        score = 0
+        for piece in nest.pieces:
+            if piece.place == Piece.PLACE_HOME:
+                score += 2
+            elif state.route.location(piece) != state.route.LOC_OUT_BOARD:
+                score += 1
+        scores.append(score)
+    total = sum(scores)
+    if total == 0:
+        return [1 / len(scores)] * len(scores)
+    return [score / total for score in scores]
+
+
+def rollout(snapshot: tuple, max_turns: int) -> List[float]:
+    '''
+    Random playout from snapshot, moves are preferred over passing
+    '''
+    state = _simulation(snapshot)
+    policy = RandomBot()
+    for _ in range(max_turns):
+        _, done = state.step(policy(state))
+        if done:
+            break
+    return evaluate(state)
+
+
+class RandomBot:
+    '''
+    Uniform over legal moves, passing only when nothing else is legal
+    '''
+
+    def __call__(self, state: GameState) -> str:
+        actions = state.legal_actions()
+        moves = [action for action in actions if action != 'pass']
+        return random.choice(moves or actions)
+
+
+class Node:
+
+    def __init__(self, player_index: int = -1) -> None:
+        # player who played the action leading to this node
+        self.player_index = player_index
+        self.children: Dict[str, Node] = {}
+        self.visits = 0
+        self.value = 0.0
+
+    def ucb(self, parent_visits: int, exploration: float) -> float:
+        return self.value / self.visits + exploration * math.sqrt(math.log(parent_visits) / self.visits)
+
+
+class MCTSBot:
+    '''
+    Open loop UCT: the tree is keyed by actions and dices are re-sampled on every descent.
+    Leaves are evaluated by random playouts, run on a process pool when num_workers > 0.
+    Random play almost never finishes a game, so playouts are kept short and scored by evaluate():
+    long ones only wash the pieces progress out to an even share.
+    '''
+
+    _pools: Dict[int, Pool] = {}
+    _pools_lock = threading.Lock()
+    # leaves sent to each worker per pool call, amortizing the pickling round trip
+    ROLLOUTS_PER_TASK = 8
+
+    def __init__(self, time_budget: Optional[float] = 1.0, rollout_budget: Optional[int] = None,
+                 num_workers: int = 4, max_rollout_turns: int = 20, exploration: float = 1.4) -> None:
+        assert time_budget is not None or rollout_budget is not None
+        self.time_budget = time_budget
+        self.rollout_budget = rollout_budget
+        self.num_workers = num_workers
+        self.max_rollout_turns = max_rollout_turns
+        self.exploration = exploration
+        # rollouts of the last search, to check the throughput of a budget
+        self.num_rollouts = 0
+
+    def _pool(self) -> Optional[Pool]:
+        if self.num_workers <= 0:
+            return None
+        # searches of several tpool threads may ask for the same pool at once
+        with MCTSBot._pools_lock:
+            if self.num_workers not in MCTSBot._pools:
+                MCTSBot._pools[self.num_workers] = Pool(self.num_workers, initializer=_init_worker)
+            return MCTSBot._pools[self.num_workers]
+
+    def __call__(self, state: GameState) -> str:
+        root_snapshot = state.snapshot()
+        legal_actions = state.legal_actions()
+        if len(legal_actions) == 1:
+            return legal_actions[0]
+
+        simulation = GameState()
+        simulation.reset(len(state.players))
+        pool = self._pool()
+        batch_size = max(self.num_workers * self.ROLLOUTS_PER_TASK, 1)
+
+        root = Node()
+        start = time.monotonic()
+        num_rollouts = 0
+        while not self._is_out_of_budget(start, num_rollouts):
+            paths = [self._select(simulation, root_snapshot, root) for _ in range(batch_size)]
+            leaves = [(snapshot, self.max_rollout_turns) for _, snapshot in paths]
+            if pool is None:
+                rewards = [rollout(*leaf) for leaf in leaves]
+            else:
+                rewards = pool.starmap(rollout, leaves, chunksize=self.ROLLOUTS_PER_TASK)
+
+            for (path, _), reward in zip(paths, rewards):
+                for node in path:
+                    node.value += reward[node.player_index]
+            num_rollouts += len(leaves)
+
+        self.num_rollouts = num_rollouts
+        return max(legal_actions, key=lambda action: root.children[action].visits if action in root.children else -1)
+
+    def _is_out_of_budget(self, start: float, num_rollouts: int) -> bool:
+        if self.rollout_budget is not None and num_rollouts >= self.rollout_budget:
+            return True
+        return self.time_budget is not None and time.monotonic() - start >= self.time_budget
+
+    def _select(self, simulation: GameState, root_snapshot: tuple, root: Node):
+        simulation.restore(root_snapshot)
+        node = root
+        node.visits += 1
+        path: List[Node] = []
+        done = False
+        while not done:
+            player_index = simulation.players.index(simulation.current_player)
+            actions = simulation.legal_actions()
+            untried = [action for action in actions if action not in node.children]
+            if untried:
+                action = random.choice(untried)
+                node.children[action] = Node(player_index)
+            else:
+                action = max(actions, key=lambda a: node.children[a].ucb(node.visits, self.exploration))
+
+            node = node.children[action]
+            # counted before the playout returns, so parallel descents spread over the tree
+            node.visits += 1
+            path.append(node)
+            _, done = simulation.step(action)
+            if untried:
+                break
+        return path, simulation.snapshot()
+
+
+def fast_mcts() -> MCTSBot:
+    '''
+    Search small enough to play many games, rollouts staying in the calling process
+    '''
+    return MCTSBot(time_budget=None, rollout_budget=16, num_workers=0, max_rollout_turns=50)
+
+
+class BotConnection(Connection):
+    '''
+    Seat played on the server by a policy, a callable taking a GameState and returning a command
+    '''
+
+    is_bot = True
+
+    def __init__(self, username, policy) -> None:
+        self.username = username
+        self.policy = policy
+        self.room = None
+        self._mirror: Optional[GameState] = None
+
+    def attach(self, room):
+        self.room = room
+
+    def send_data(self, channel, data):
+        if channel == self.CHANNEL_TURN and self.room is not None:
+            eventlet.spawn_n(self._play)
+        return True
+
+    def choose(self, state: GameState) -> str:
+        '''
+        Command of the policy for state. Searches run in a native thread on a private copy of state,
+        cheap policies play in the calling green thread.
+        '''
+        if not isinstance(self.policy, MCTSBot):
+            return self.policy(state)
+
+        if self._mirror is None:
+            self._mirror = GameState()
+            self._mirror.reset(len(state.players))
+        self._mirror.restore(state.snapshot())
+        return tpool.execute(self.policy, self._mirror)
+
+    def _play(self):
+        turn = self.room.state.turn
+        command_str = self.choose(self.room.state)
+        # the turn may have timed out while searching
+        if self.room.state.turn == turn:
+            self.room.receive_command(self, command_str)
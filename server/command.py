@@ -1,8 +1,8 @@
 from objects.nest import Nest
 from objects.board import Home, Route
-from error import CannotMoveError, InvalidDiceError, NoError, Status
+from error import OK, CannotMoveError, InvalidDiceError, Status
 from typing import Iterable, List
-from objects.piece import Piece
+from objects.piece import EMPTY_PIECE, Piece
 
 
 class Command:
@@ -24,7 +24,7 @@ class CommandSequence(Command):
             if not status.ok():
                 return status
             self.max_success_index = i
-        return NoError()
+        return OK
 
     def undo(self):
         for command in reversed(list(self.commands[:self.max_success_index + 1])):
@@ -42,7 +42,7 @@ class DiceConsumedCommand(Command):
 
         self.index = self.dices.index(self.steps)
         self.dices.pop(self.index)
-        return NoError()
+        return OK
 
     def undo(self):
         self.dices.insert(self.index, self.steps)
@@ -59,12 +59,16 @@ class MoveRouteCommand(DiceConsumedCommand):
         if not status.ok():
             return status
 
+        self.new_location = self.route.next_location(self.route.location(self.piece), self.steps)
+        self.captured = self.route.piece_at(self.new_location)
         self.status = self.route.move(self.piece, self.steps)
         return self.status
 
     def undo(self):
         super().undo()
         self.route.undo_move(self.piece, self.steps)
+        if self.captured is not EMPTY_PIECE:
+            self.route.set_location(self.captured, self.new_location)
 
 
 class MoveToHomeCommand(DiceConsumedCommand):
@@ -85,9 +89,9 @@ class MoveToHomeCommand(DiceConsumedCommand):
                 self.route.clear_location(piece_location)
                 self.home.set_location(self.piece, self.steps - 1)
                 self.piece.set_place(Piece.PLACE_HOME)
-                return NoError()
+                return OK
 
-        return CannotMoveError(self.piece.name, self.steps)
+        return CannotMoveError(self.piece, self.steps)
 
     def undo(self):
         super().undo()
@@ -127,12 +131,15 @@ class StartCommand(DiceConsumedCommand):
         if not status.ok():
             return status
 
+        self.captured = self.route.piece_at(self.nest.player.offset)
         status = self.nest.move(self.route, self.steps)
         return status
 
     def undo(self):
         super().undo()
         self.nest.undo_move(self.route)
+        if self.captured is not EMPTY_PIECE:
+            self.route.set_location(self.captured, self.nest.player.offset)
 
 
 class PassCommand(Command):
@@ -141,8 +148,7 @@ class PassCommand(Command):
         self.player = player
 
     def execute(self):
-        print(f'Player {self.player.name} passed.')
-        return NoError()
+        return OK
 
 
 class ShowHelpCommand(Command):
@@ -153,4 +159,4 @@ class ShowHelpCommand(Command):
     def execute(self):
         print(self.help_str)
         input('Press any key to continue.')
-        return NoError()
+        return OK
@@ -1,11 +1,18 @@
 from error import Status
 from socketio import Server
+from wire import PROTOCOL_JSON
 
 
 class Connection:
 
     CHANNEL_TURN = 'turn'
     CHANNEL_STATUS = 'status'
+    CHANNEL_RESULT = 'result'
+
+    is_bot = False
+    # receives turns through the room broadcast instead of its own channel
+    joins_broadcast = False
+    protocol = PROTOCOL_JSON
 
     def send_data(self, channel, data) -> bool:
         pass
@@ -16,17 +23,45 @@ class Connection:
 
 class PlayerConnection(Connection):
 
-    def __init__(self, sio: Server, sid, username) -> None:
+    def __init__(self, sio: Server, sid, username, protocol=PROTOCOL_JSON) -> None:
         self.sio = sio
         self.sid = sid
         self.username = username
+        self.protocol = protocol
+        # the room broadcast is JSON, binary sockets get their own frames
+        self.joins_broadcast = protocol == PROTOCOL_JSON
 
     def send_data(self, channel, data):
         self.sio.emit(channel, data, to=self.sid)
         return True
 
 
+class RoomConnection(Connection):
+    '''
+    Every socket in a socket.io room, players and spectators alike
+    '''
+
+    def __init__(self, sio: Server, room_name) -> None:
+        self.sio = sio
+        self.room_name = room_name
+
+    def send_data(self, channel, data):
+        self.sio.emit(channel, data, room=self.room_name)
+        return True
+
+
 class NoConnection(Connection):
 
     def send_data(self, channel, data):
         return False
+
+
+class LocalConnection(Connection):
+
+    def __init__(self, username) -> None:
+        self.username = username
+        self.inbox = {}
+
+    def send_data(self, channel, data):
+        self.inbox[channel] = data
+        return True
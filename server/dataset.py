@@ -0,0 +1,260 @@
+import glob
+import json
+import os
+import random
+from argparse import ArgumentParser
+from multiprocessing import Pool, cpu_count
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from action import OP_MOVE, OP_MOVE_HOME, OP_START, PASS, Action, format_actions, parse_actions
+from gamestate import GameState
+from replay import GameReplay
+
+
+def _all_actions() -> List[Tuple[Action, ...]]:
+    singles: List[Action] = []
+    for steps in range(1, 7):
+        singles.append((OP_START, -1, steps))
+        for index in range(GameState.MAX_NUM_PIECE_PER_PLAYER):
+            singles.append((OP_MOVE, index, steps))
+            singles.append((OP_MOVE_HOME, index, steps))
+    return [(PASS,)] + [(first,) for first in singles] + [(first, second) for first in singles for second in singles]
+
+
+# fixed action space: every command legal_actions() may list has an index
+ACTIONS = _all_actions()
+ACTION_INDEX: Dict[Tuple[Action, ...], int] = {actions: index for index, actions in enumerate(ACTIONS)}
+NUM_ACTIONS = len(ACTIONS)
+
+# name: (dtype, packed width or None for a scalar per row)
+COLUMNS = {
+    'obs': (np.uint8, 'obs'),  # bit packed observation of the acting seat
+    'next_obs': (np.uint8, 'obs'),  # same seat at its next turn, or at the end of the game
+    'legal': (np.uint8, 'legal'),  # bit packed mask over ACTIONS
+    'action': (np.int16, None),
+    'reward': (np.float32, None),  # on the last transition of a seat: 1 for the winner, -1 for the others
+    'done': (np.bool_, None),  # last transition of the seat in the game
+    'truncated': (np.bool_, None),  # the game stopped before anybody won
+    'seat': (np.int8, None),
+    'game': (np.int64, None),
+    'turn': (np.int32, None),
+}
+
+
+def legal_mask(state: GameState, out: Optional[np.ndarray] = None) -> np.ndarray:
+    if out is None:
+        out = np.zeros(NUM_ACTIONS, dtype=np.uint8)
+    else:
+        out[:] = 0
+    out[[ACTION_INDEX[actions] for actions in state.legal_action_tuples()]] = 1
+    return out
+
+
+def game_columns(turns: Iterable[Tuple[GameState, str]], final: GameState = None) -> Dict[str, np.ndarray]:
+    '''
+    Transitions of one game from (state, command) pairs and its final state
+    '''
+    rows: Dict[str, list] = {name: [] for name in COLUMNS if name not in ('next_obs', 'reward', 'done')}
+    state = None
+    for state, command in turns:
+        rows['obs'].append(np.packbits(state.observe()))
+        rows['legal'].append(np.packbits(legal_mask(state)))
+        rows['action'].append(ACTION_INDEX[parse_actions(command)])
+        rows['seat'].append(state.players.index(state.current_player))
+        rows['turn'].append(state.turn)
+    final = state if final is None else final
+
+    num_rows = len(rows['action'])
+    seats = np.array(rows['seat'], dtype=np.int8)
+    # explicit widths, a game stopped before its first turn has no rows to infer them from
+    obs_width = 0 if final is None else (final.encoder.size + 7) // 8
+    obs = np.array(rows['obs'], dtype=np.uint8).reshape(num_rows, obs_width)
+    next_obs = np.empty_like(obs)
+    reward = np.zeros(num_rows, dtype=np.float32)
+    done = np.zeros(num_rows, dtype=np.bool_)
+    winner = final.winner() if final is not None else None
+    for seat in np.unique(seats):
+        steps = np.flatnonzero(seats == seat)
+        next_obs[steps[:-1]] = obs[steps[1:]]
+        next_obs[steps[-1]] = np.packbits(final.observe(player=final.players[seat]))
+        done[steps[-1]] = True
+        if winner is not None:
+            reward[steps[-1]] = 1.0 if final.players[seat] == winner else -1.0
+
+    return {
+        'obs': obs,
+        'next_obs': next_obs,
+        'legal': np.array(rows['legal'], dtype=np.uint8).reshape(num_rows, (NUM_ACTIONS + 7) // 8),
+        'action': np.array(rows['action'], dtype=np.int16),
+        'reward': reward,
+        'done': done,
+        'truncated': np.full(num_rows, winner is None, dtype=np.bool_),
+        'seat': seats,
+        'game': np.zeros(num_rows, dtype=np.int64),
+        'turn': np.array(rows['turn'], dtype=np.int32),
+    }
+
+
+class TrajectoryWriter:
+    '''
+    Streams game columns into shards of shard_size rows, one .npy file per column
+    '''
+
+    VERSION = 1
+
+    def __init__(self, out_dir: str, num_players: int, shard_size: int = 1 << 16) -> None:
+        os.makedirs(out_dir, exist_ok=True)
+        self.out_dir = out_dir
+        self.num_players = num_players
+        self.shard_size = shard_size
+        self.obs_size = _observation_size(num_players)
+        self.widths = {'obs': (self.obs_size + 7) // 8, 'legal': (NUM_ACTIONS + 7) // 8}
+        self.shards: List[Dict] = []
+        self.num_games = 0
+        self._buffer = self._empty_buffer()
+        self._filled = 0
+
+    def _empty_buffer(self) -> Dict[str, np.ndarray]:
+        buffer = {}
+        for name, (dtype, width) in COLUMNS.items():
+            shape = (self.shard_size,) if width is None else (self.shard_size, self.widths[width])
+            buffer[name] = np.empty(shape, dtype=dtype)
+        return buffer
+
+    def add_game(self, columns: Dict[str, np.ndarray]):
+        num_rows = len(columns['action'])
+        if num_rows == 0:
+            return
+        if columns['obs'].shape[1] != self.widths['obs']:
+            raise ValueError(f'Game observations are not the ones of {self.num_players} players')
+
+        columns['game'][:] = self.num_games
+        self.num_games += 1
+        start = 0
+        while start < num_rows:
+            count = min(num_rows - start, self.shard_size - self._filled)
+            for name, column in columns.items():
+                self._buffer[name][self._filled:self._filled + count] = column[start:start + count]
+            self._filled += count
+            start += count
+            if self._filled == self.shard_size:
+                self._flush()
+
+    def _flush(self):
+        if self._filled == 0:
+            return
+        name = f'shard-{len(self.shards):05d}'
+        for column, values in self._buffer.items():
+            np.save(os.path.join(self.out_dir, f'{name}.{column}.npy'), values[:self._filled])
+        self.shards.append({'name': name, 'rows': self._filled})
+        self._filled = 0
+
+    def close(self):
+        self._flush()
+        index = {
+            'version': self.VERSION,
+            'num_players': self.num_players,
+            'obs_size': self.obs_size,
+            'num_actions': NUM_ACTIONS,
+            'actions': [format_actions(actions) for actions in ACTIONS],
+            'columns': {name: np.dtype(dtype).name for name, (dtype, _) in COLUMNS.items()},
+            'rows': sum(shard['rows'] for shard in self.shards),
+            'games': self.num_games,
+            'shards': self.shards,
+        }
+        with open(os.path.join(self.out_dir, 'index.json'), 'w') as file:
+            json.dump(index, file)
+
+
+def _observation_size(num_players: int) -> int:
+    state = GameState()
+    state.reset(num_players)
+    return state.encoder.size
+
+
+def load_shards(out_dir: str, columns: Sequence[str] = tuple(COLUMNS)) -> Tuple[Dict, List[Dict[str, np.ndarray]]]:
+    '''
+    Index and memory mapped columns of every shard
+    '''
+    with open(os.path.join(out_dir, 'index.json')) as file:
+        index = json.load(file)
+    shards = [{column: np.load(os.path.join(out_dir, f'{shard["name"]}.{column}.npy'), mmap_mode='r')
+               for column in columns} for shard in index['shards']]
+    return index, shards
+
+
+def log_players(path: str) -> List[str]:
+    '''
+    Players of a GameLog, read from its header only
+    '''
+    with open(path) as file:
+        return json.loads(file.readline())['players']
+
+
+def replay_columns(path: str) -> Dict[str, np.ndarray]:
+    replay = GameReplay(path)
+    return game_columns(iter(replay), replay.state)
+
+
+def self_play_columns(task) -> Dict[str, np.ndarray]:
+    '''
+    One game of the policies of tournament.load_policy, task being (specs, seed, max_turns)
+    '''
+    from tournament import load_policy
+
+    specs, seed, max_turns = task
+    random.seed(seed)
+    np.random.seed(seed % 2 ** 32)
+    policies = [load_policy(spec) for spec in specs]
+    state = GameState()
+    state.reset(len(specs), seed=seed)
+
+    def turns():
+        while not state.is_done() and state.turn < max_turns:
+            command = state.legal_or_pass(policies[state.players.index(state.current_player)](state))
+            yield state, command
+            state.step(command)
+
+    return game_columns(turns(), state)
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Export trajectories as memory mappable NumPy shards')
+    parser.add_argument('out_dir')
+    parser.add_argument('--logs', nargs='*', default=[], help='GameLog files or globs to export')
+    parser.add_argument('--self-play', nargs='*', default=[], help='policy specs seated in self-play games')
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--max-turns', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--shard-size', type=int, default=1 << 16)
+    parser.add_argument('--workers', type=int, default=cpu_count())
+    args = parser.parse_args()
+
+    paths = sorted(path for pattern in args.logs for path in glob.glob(pattern))
+    if args.self_play:
+        num_players = len(args.self_play)
+        tasks = [(args.self_play, args.seed * 1000003 + game, args.max_turns) for game in range(args.games)]
+        work, function = tasks, self_play_columns
+    else:
+        if not paths:
+            parser.error('--logs matched no file')
+        # shards have the observation width of one player count
+        num_players = len(log_players(paths[0]))
+        for path in paths:
+            if len(log_players(path)) != num_players:
+                parser.error(f'{path} is not a {num_players} players game, export each player count apart')
+        work, function = paths, replay_columns
+
+    writer = TrajectoryWriter(args.out_dir, num_players, args.shard_size)
+    if args.workers > 1:
+        with Pool(args.workers) as pool:
+            for columns in pool.imap(function, work):
+                writer.add_game(columns)
+    else:
+        for columns in map(function, work):
+            writer.add_game(columns)
+    writer.close()
+    print(f'{writer.num_games} games, {sum(shard["rows"] for shard in writer.shards)} transitions '
+          f'in {len(writer.shards)} shards')
@@ -0,0 +1,60 @@
+from typing import Dict, Optional
+
+import numpy as np
+
+
+class TurnDeltaEncoder:
+    '''
+    Turns of one stream numbered by `seq`, full after a resync and otherwise only the changed locations
+    '''
+
+    def __init__(self, stream: Optional[str] = None) -> None:
+        # seat name of the receiver, None for the room broadcast
+        self.stream = stream
+        self.seq = 0
+        self._last: Optional[tuple] = None
+
+    def resync(self):
+        self._last = None
+
+    def encode(self, state) -> Dict:
+        snapshot = state.snapshot()
+        self.seq += 1
+        if self._last is None:
+            out = self.full(state)
+        else:
+            out = self._delta(state, self._last, snapshot)
+            out['seq'] = self.seq
+            out['stream'] = self.stream
+        self._last = snapshot
+        return out
+
+    def full(self, state) -> Dict:
+        '''
+        Full turn info numbered as the last encoded turn, for a receiver joining a shared stream
+        '''
+        out = state.get_turn_info()
+        out['full'] = True
+        out['seq'] = self.seq
+        out['stream'] = self.stream
+        return out
+
+    @staticmethod
+    def _delta(state, last: tuple, snapshot: tuple) -> Dict:
+        _, _, _, last_route, last_homes, _ = last
+        _, _, _, route, homes, _ = snapshot
+
+        # route: [[location, piece], ...], homes: [[home index, location, piece], ...], nests never change
+        out = {}
+        out['full'] = False
+        out['dice_values'] = state.current_dices
+        out['current_player'] = state.current_player.name
+        out['route'] = [[location, state.route.piece_at(location).to_dict()]
+                        for location, (old, new) in enumerate(zip(last_route, route)) if old != new]
+        out['homes'] = [[index, location, home.piece_at(location).to_dict()]
+                        for index, (home, last_home, home_state) in enumerate(zip(state.homes, last_homes, homes))
+                        if last_home != home_state
+                        for location, (old, new) in enumerate(zip(last_home, home_state)) if old != new]
+        out['legal_actions'] = state.legal_actions()
+        out['observation'] = np.packbits(state.observe()).tobytes()
+        return out
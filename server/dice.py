@@ -0,0 +1,35 @@
+from typing import List, Optional
+
+import numpy as np
+
+
+def new_seed() -> int:
+    '''
+    Seed for a new game, taken from the global NumPy generator so that seeding it reproduces whole runs
+    '''
+    return int(np.random.randint(0, 2 ** 63 - 1, dtype=np.int64))
+
+
+class DiceRoller:
+    '''
+    Dices of one game, drawn from a generator of its own in blocks of block_size rolls.
+    The same seed always gives the same rolls, `num_rolls` counts the rolls handed out.
+    '''
+
+    def __init__(self, seed: Optional[int] = None, block_size: int = 1024) -> None:
+        self.seed = new_seed() if seed is None else seed
+        self.block_size = block_size
+        self.rng = np.random.default_rng(self.seed)
+        self.num_rolls = 0
+        # int8 rows, only the roll handed out becomes a list
+        self._block = np.empty((0, 2), dtype=np.int8)
+        self._next = 0
+
+    def roll(self) -> List[int]:
+        if self._next == len(self._block):
+            self._block = self.rng.integers(1, 7, size=(self.block_size, 2), dtype=np.int8)
+            self._next = 0
+        dices = self._block[self._next].tolist()
+        self._next += 1
+        self.num_rolls += 1
+        return dices
@@ -0,0 +1,55 @@
+import numpy as np
+
+from objects.piece import Piece
+
+
+class ObservationEncoder:
+    '''
+    Fixed size uint8 observation of a game, seats and route rotated to the observing player
+    '''
+
+    NUM_DICE_VALUES = 6
+
+    def __init__(self, num_players: int, lane_size: int, home_size: int = 6, num_pieces: int = 4) -> None:
+        self.num_players = num_players
+        self.route_size = num_players * lane_size
+        self.home_size = home_size
+        self.num_pieces = num_pieces
+
+        # route, home and nest planes of every seat, then both dices one-hot
+        self.home_start = num_players * self.route_size
+        self.nest_start = self.home_start + num_players * home_size
+        self.dice_start = self.nest_start + num_players * num_pieces
+        self.size = self.dice_start + 2 * self.NUM_DICE_VALUES
+
+    @property
+    def shape(self):
+        return (self.size,)
+
+    def encode(self, state, out: np.ndarray = None, player=None) -> np.ndarray:
+        '''
+        Observation of player, the current player by default
+        '''
+        if out is None:
+            out = np.zeros(self.size, dtype=np.uint8)
+        else:
+            out[:] = 0
+
+        player = state.current_player if player is None else player
+        current = state.players.index(player)
+        door = player.offset
+        for index, (nest, home) in enumerate(zip(state.nests, state.homes)):
+            seat = (index - current) % self.num_players
+            for piece in nest.pieces:
+                if piece.place == Piece.PLACE_NEST:
+                    out[self.nest_start + seat * self.num_pieces + piece.index] = 1
+                elif piece.place == Piece.PLACE_HOME:
+                    out[self.home_start + seat * self.home_size + home.location(piece)] = 1
+                else:
+                    location = state.route.location(piece)
+                    if location != state.route.LOC_OUT_BOARD:
+                        out[seat * self.route_size + (location - door) % self.route_size] = 1
+
+        for i, dice in enumerate(state.current_dices):
+            out[self.dice_start + i * self.NUM_DICE_VALUES + dice - 1] = 1
+        return out
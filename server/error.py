@@ -1,7 +1,22 @@
 class Status:
+    '''
+    Result of an operation. Subclasses give their code as a class attribute and a desc template
+    formatted from their arguments only when desc is read.
+    '''
+
+    __slots__ = ('code', '_desc', '_args')
+
+    template = ''
+
     def __init__(self, code, desc):
         self.code = code
-        self.desc = desc
+        self._desc = desc
+
+    @property
+    def desc(self) -> str:
+        if self._desc is None:
+            self._desc = self.template.format(*self._args)
+        return self._desc
 
     def __str__(self) -> str:
         return f'{self.code}: {self.desc}'
@@ -13,57 +28,123 @@ class Status:
         return self.code == NoError.code
 
 
-class NoError(Status):
+class _FormattedStatus(Status):
 
-    code = 0
+    __slots__ = ()
+
+    def __init__(self, *args) -> None:
+        self._desc = None
+        self._args = args
+
+
+class _ConstantStatus(Status):
+    '''
+    Status without arguments, built once: every call returns the same immutable instance
+    '''
+
+    __slots__ = ()
+
+    def __new__(cls):
+        instance = cls.__dict__.get('_instance', None)
+        if instance is None:
+            instance = super().__new__(cls)
+            object.__setattr__(instance, '_desc', cls.template)
+            cls._instance = instance
+        return instance
 
     def __init__(self) -> None:
-        super().__init__(0, 'OK')
+        pass
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{type(self).__name__} is shared and cannot be modified')
+
+
+class NoError(_ConstantStatus):
+
+    __slots__ = ()
+
+    code = 0
+    template = 'OK'
+
+
+OK = NoError()
+
+
+class CannotMoveError(_FormattedStatus):
 
+    __slots__ = ()
 
-class CannotMoveError(Status):
+    code = -1
+    template = 'Could not move {} {} steps'
 
     def __init__(self, piece_name, steps) -> None:
-        code = -1
-        desc = f'Could not move {piece_name} {steps} steps'
-        super().__init__(code, desc)
+        super().__init__(piece_name, steps)
 
 
-class InvalidDiceError(Status):
+class InvalidDiceError(_FormattedStatus):
+
+    __slots__ = ()
+
+    code = -2
+    template = 'Could not move {} steps. Available steps = {}'
 
     def __init__(self, dice_value, correct_values) -> None:
-        code = -2
-        desc = f'Could not move {dice_value} steps. Available steps = {correct_values}'
-        super().__init__(code, desc)
+        # the dices list changes once the turn goes on
+        super().__init__(dice_value, list(correct_values))
+
 
+class InvalidCommandError(_FormattedStatus):
 
-class InvalidCommandError(Status):
+    __slots__ = ()
+
+    code = -3
+    template = 'Invalid command "{}"'
 
     def __init__(self, command_str) -> None:
-        code = -3
-        desc = f'Invalid command "{command_str}"'
-        super().__init__(code, desc)
+        super().__init__(command_str)
 
 
-class InvalidTurnError(Status):
+class InvalidTurnError(_ConstantStatus):
 
-    def __init__(self) -> None:
-        code = -4
-        desc = 'This is not your turn'
-        super().__init__(code, desc)
+    __slots__ = ()
 
+    code = -4
+    template = 'This is not your turn'
 
-class IsPlayingError(Status):
 
-    def __init__(self) -> None:
-        code = -5
-        desc = 'Game is current playing'
-        super().__init__(code, desc)
+class IsPlayingError(_ConstantStatus):
+
+    __slots__ = ()
+
+    code = -5
+    template = 'Game is current playing'
+
+
+class IsInRoomError(_FormattedStatus):
 
+    __slots__ = ()
 
-class IsInRoomError(Status):
+    code = -6
+    template = 'You are already in room "{}"'
 
     def __init__(self, room_name) -> None:
-        code = -6
-        desc = f'You are already in room "{room_name}"'
-        super().__init__(code, desc)
+        super().__init__(room_name)
+
+
+class TurnTimeoutError(_FormattedStatus):
+
+    __slots__ = ()
+
+    code = -7
+    template = 'No command received within {} seconds, turn passed'
+
+    def __init__(self, seconds) -> None:
+        super().__init__(seconds)
+
+
+class CommandQueueFullError(_ConstantStatus):
+
+    __slots__ = ()
+
+    code = -8
+    template = 'Too many pending commands, try again later'
@@ -1,10 +1,13 @@
+from bisect import bisect_left, insort
 from gameroom import GameRoom
-from typing import Dict
+from typing import Dict, List
 from error import Status
 
 
 class GameRoomDB:
     rooms: Dict[str, GameRoom] = {}
+    # room names kept sorted so that a listing by prefix only visits the matching rooms
+    names: List[str] = []
 
     @staticmethod
     def leave(connection, room_name):
@@ -14,12 +17,43 @@ class GameRoomDB:
         room = GameRoomDB.rooms[room_name]
         room.leave(connection)
         if room.empty():
-            GameRoomDB.rooms.pop(room_name)
+            GameRoomDB.remove(room_name)
 
     @staticmethod
     def join(connection, room_name) -> Status:
-        room = GameRoomDB.rooms.get(room_name, GameRoom())
+        room = GameRoomDB.rooms.get(room_name, None)
+        is_new = room is None
+        if is_new:
+            room = GameRoom()
         status = room.enter(connection)
-        if status.ok():
-            GameRoomDB.rooms[room_name] = room
+        if status.ok() and is_new:
+            GameRoomDB.add(room_name, room)
         return status
+
+    @staticmethod
+    def add(room_name, room: GameRoom):
+        GameRoomDB.rooms[room_name] = room
+        insort(GameRoomDB.names, room_name)
+
+    @staticmethod
+    def remove(room_name):
+        if GameRoomDB.rooms.pop(room_name, None) is not None:
+            GameRoomDB.names.pop(bisect_left(GameRoomDB.names, room_name))
+
+    @staticmethod
+    def list(offset: int = 0, limit: int = 100, prefix: str = '', joinable: bool = False) -> List[str]:
+        '''
+        Room names in alphabetical order starting with prefix, optionally only those a player can still join
+        '''
+        out = []
+        names = GameRoomDB.names
+        for i in range(bisect_left(names, prefix), len(names)):
+            if len(out) == limit or not names[i].startswith(prefix):
+                break
+            if joinable and not GameRoomDB.rooms[names[i]].is_joinable():
+                continue
+            if offset > 0:
+                offset -= 1
+                continue
+            out.append(names[i])
+        return out
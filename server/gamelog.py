@@ -0,0 +1,44 @@
+import json
+
+
+class GameLog:
+    '''
+    Append-only record of one game, one JSON value per line, read back by replay.GameReplay
+    '''
+
+    VERSION = 1
+
+    def __init__(self, path: str, keyframe_interval: int = 64) -> None:
+        self.path = path
+        self.keyframe_interval = keyframe_interval
+        self._file = open(path, 'a')
+
+    def _write(self, value):
+        self._file.write(json.dumps(value, separators=(',', ':')))
+        self._file.write('\n')
+
+    def start(self, state):
+        self._write({
+            'version': self.VERSION,
+            'seed': state.dice.seed,
+            'players': [player.name for player in state.players],
+            'keyframe_interval': self.keyframe_interval,
+        })
+
+    def begin_turn(self, state):
+        if state.turn % self.keyframe_interval == 0:
+            self._write({'keyframe': state.snapshot()})
+            self._file.flush()
+
+    def record(self, state, command: str):
+        self._write([state.turn, state.current_dices, command])
+
+    def close(self, state=None):
+        if state is not None:
+            winner = state.winner()
+            self._write({'end': state.snapshot(), 'winner': None if winner is None else winner.name})
+        self._file.close()
+
+    @property
+    def closed(self) -> bool:
+        return self._file.closed
@@ -1,9 +1,12 @@
-from connection import PlayerConnection
-from error import IsPlayingError, NoError, Status
+from connection import Connection, NoConnection, PlayerConnection
+from error import CommandQueueFullError, IsPlayingError, NoError, Status
 from typing import Dict, Optional
 from gamestate import GameState
-import queue
+from gamelog import GameLog
+from eventlet.queue import Empty, Full, Queue
 import eventlet
+import os
+import time
 
 
 class GameRoom:
@@ -12,12 +15,20 @@ class GameRoom:
     COMMAND_FULL_TIMEOUT = 5
     MAX_NUM_PLAYER = 4
     MIN_NUM_PLAYER = 2
+    MAX_BOT_TURNS = 10000
+    # bot-only games give the hub a turn this often, cheap policies never yield on their own
+    BOT_YIELD_TURNS = 16
+    # every game writes a GameLog in this directory when set
+    LOG_DIR: Optional[str] = None
 
-    def __init__(self) -> None:
+    def __init__(self, record_moves: bool = False) -> None:
         self.state: Optional[GameState] = None
-        self._command_queue = queue.Queue(100)
+        self._command_queue = Queue(100)
         self.is_playing = False
         self.connection_ready: Dict[PlayerConnection, bool] = {}
+        self.audience: Connection = NoConnection()
+        # move log of bot-only games, sent with their result
+        self.record_moves = record_moves
 
     def enter(self, connection) -> Status:
         if self.is_playing or connection in self.connection_ready.keys():
@@ -26,16 +37,35 @@ class GameRoom:
         self.connection_ready[connection] = False
         return NoError()
 
+    def add_bot(self, connection) -> Status:
+        if len(self.connection_ready) >= self.MAX_NUM_PLAYER:
+            return Status(-1, 'Room is full')
+
+        status = self.enter(connection)
+        if status.ok():
+            connection.attach(self)
+            self.connection_ready[connection] = True
+        return status
+
     def leave(self, connection):
         self.connection_ready.pop(connection)
         if self.is_playing:
             self.state.disconnect(connection)
+            if self.empty():
+                # wakes the game loop up so it stops without waiting for a turn timeout
+                try:
+                    self._command_queue.put_nowait((None, None))
+                except Full:
+                    pass
 
     def ready(self, connection):
         self.connection_ready[connection] = not self.connection_ready[connection]
 
     def empty(self) -> bool:
-        return len(self.connection_ready) == 0
+        return all(connection.is_bot for connection in self.connection_ready)
+
+    def is_joinable(self) -> bool:
+        return not self.is_playing and len(self.connection_ready) < self.MAX_NUM_PLAYER
 
     def is_able_to_start(self):
         return not self.is_playing and all(list(self.connection_ready.values())) and \
@@ -45,27 +75,88 @@ class GameRoom:
         if self.is_playing:
             return
 
+        state = GameState(audience=self.audience)
+        if self.LOG_DIR is not None:
+            name = f'{time.strftime("%Y%m%d-%H%M%S")}-{state.dice.seed}.jsonl'
+            try:
+                state.log = GameLog(os.path.join(self.LOG_DIR, name))
+            except OSError as exception:
+                # the game goes on unlogged rather than leaving the room stuck
+                print('Game log:', exception)
+        self.state = state
         self.is_playing = True
-        self.state = GameState()
+        if self.empty():
+            self._play_bots()
+            return
+
         self.state.start(list(self.connection_ready.keys()))
-        while True:
+        turn = None
+        while not self.state.is_done():
+            if self.empty():
+                # nobody is left to play against: bots would search and human seats time out forever
+                print('Game abandoned')
+                break
+            if self.state.turn != turn:
+                turn = self.state.turn
+                deadline = time.monotonic() + self.PLAYER_WAIT_TIMEOUT
+
             try:
-                eventlet.sleep()
+                # blocks this green thread only, the hub wakes it up on put or timeout
                 connection: PlayerConnection
                 command_str: str
-                connection, command_str = self._command_queue.get(block=False)
-            except queue.Empty:
+                connection, command_str = self._command_queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except Empty:
+                self.state.timeout_turn(self.PLAYER_WAIT_TIMEOUT)
+                continue
+            if connection is None:
                 continue
 
             self.state.process_command(connection, command_str)
-            if self.state.is_done():
-                break
+        if self.state.log is not None:
+            self.state.log.close(self.state)
         print('Game done')
 
+    def _play_bots(self):
+        '''
+        Every seat is a bot: their policies play in-process without turn messages or waits,
+        observers only get the result
+        '''
+        self.state.headless = True
+        self.state.start(list(self.connection_ready.keys()))
+        moves = []
+        while not self.state.is_done() and self.state.turn < self.MAX_BOT_TURNS:
+            player = self.state.current_player
+            command_str = self.state.legal_or_pass(player.connection.choose(self.state))
+            self.state.step(command_str)
+            if self.record_moves:
+                moves.append([player.name, command_str])
+            if self.state.turn % self.BOT_YIELD_TURNS == 0:
+                eventlet.sleep(0)
+
+        winner = self.state.winner()
+        result = {
+            'players': [player.name for player in self.state.players],
+            'winner': None if winner is None else winner.name,
+            'turns': self.state.turn,
+            'seed': self.state.dice.seed,
+        }
+        if self.record_moves:
+            result['moves'] = moves
+        self.audience.send_data(Connection.CHANNEL_RESULT, result)
+        if self.state.log is not None:
+            self.state.log.close(self.state)
+
+    def resync(self, connection):
+        if self.is_playing:
+            self.state.resync(connection)
+
     def receive_command(self, connection: PlayerConnection, command_str: str) -> Status:
 
         if not self.is_playing:
             return Status(-1, 'Game has not started yet')
 
-        self._command_queue.put((connection, command_str), block=True)
+        try:
+            self._command_queue.put((connection, command_str), timeout=self.COMMAND_FULL_TIMEOUT)
+        except Full:
+            return CommandQueueFullError()
         return NoError()
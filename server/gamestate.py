@@ -1,15 +1,19 @@
-import copy
 from visualizer import IGameStateVisualizer, NoVisualizer
-import re
 from objects.nest import Nest
 from objects.board import Home, Route
 from command import (Command, CommandSequence, MoveInHomeCommand, MoveRouteCommand,
                      MoveToHomeCommand, PassCommand, StartCommand)
 from player import Player
-from connection import Connection, NoConnection, PlayerConnection
+from action import (Action, OP_MOVE, OP_MOVE_HOME, OP_PASS, OP_START, PASS, compile_command,
+                    format_actions)
+from encoder import ObservationEncoder
+from delta import TurnDeltaEncoder
+from dice import DiceRoller
+from gamelog import GameLog
+from connection import Connection, LocalConnection, NoConnection, PlayerConnection
 import numpy as np
-from typing import List, Optional
-from error import InvalidCommandError, InvalidTurnError
+from typing import Dict, List, Optional, Set, Tuple
+from error import OK, InvalidCommandError, InvalidTurnError, Status, TurnTimeoutError
 from exception import InvalidCommandException
 
 
@@ -19,16 +23,38 @@ class GameState:
     PLAYER_LANE_SIZE = 14
     MAX_NUM_PLAYER = 4
     MAX_NUM_PIECE_PER_PLAYER = 4
+    HEADLESS_PLAYER_NAMES = ['A', 'B', 'C', 'D']
 
-    def __init__(self, visualizer=NoVisualizer()) -> None:
-        # type: (IGameStateVisualizer,) -> None
+    def __init__(self, visualizer=NoVisualizer(), audience=NoConnection(), seed=None) -> None:
+        # type: (IGameStateVisualizer, Connection, Optional[int]) -> None
         self.players: List[Player] = []
         self.route: Optional[Route] = None
         self.homes: List[Home] = []
         self.nests: List[Nest] = []
+        self.player_of: Dict[Connection, Player] = {}
+        self.home_of: Dict[Player, Home] = {}
+        self.nest_of: Dict[Player, Nest] = {}
         self.current_player: Optional[Player] = None
         self.visualizer = visualizer
         self.current_dices = None
+        self._legal_actions: Optional[List[str]] = None
+        self._legal_set: Set[Tuple[Action, ...]] = set()
+        self.turn = 0
+        self.headless = False
+        # replaying the commands of a game with its seed gives the same game
+        self._seed = seed
+        self._dice: Optional[DiceRoller] = None
+        self.log: Optional[GameLog] = None
+        # players and spectators sharing one turn stream, encoded once per turn
+        self.audience = audience
+        self.audience_encoder = TurnDeltaEncoder()
+
+    @property
+    def dice(self) -> DiceRoller:
+        # built on first use, reset() brings its own
+        if self._dice is None:
+            self._dice = DiceRoller(self._seed)
+        return self._dice
 
     def start(self, connections: List[PlayerConnection]):
         assert len(connections) >= 2
@@ -41,37 +67,97 @@ class GameState:
             self.players.append(player)
             self.homes.append(Home(player))
             self.nests.append(Nest(player))
+            self.player_of[connection] = player
+            self.home_of[player] = self.homes[-1]
+            self.nest_of[player] = self.nests[-1]
 
         # setup round
         for i, player in enumerate(self.players[:-1]):
             player.set_next_player(self.players[i + 1])
         self.players[-1].set_next_player(self.players[0])
         self.current_player = self.players[0]
+        self.pieces = [piece for nest in self.nests for piece in nest.pieces]
+        self.piece_codes = {piece: code for code, piece in enumerate(self.pieces)}
+        self.encoder = ObservationEncoder(len(self.players), self.PLAYER_LANE_SIZE,
+                                          num_pieces=self.MAX_NUM_PIECE_PER_PLAYER)
 
         self._roll_dice()
+        if self.log is not None:
+            self.log.start(self)
+            self.log.begin_turn(self)
         self.send_turn()
 
+    def reset(self, num_players: int = 2, seed: Optional[int] = None):
+        '''
+        Start a new game without any socket, every seat is then played through `step`
+        '''
+        self._dice = DiceRoller(seed)
+        self.players = []
+        self.homes = []
+        self.nests = []
+        self.player_of = {}
+        self.home_of = {}
+        self.nest_of = {}
+        self.turn = 0
+        self.headless = True
+        self.start([LocalConnection(name) for name in self.HEADLESS_PLAYER_NAMES[:num_players]])
+        return self.get_turn_info()
+
+    def step(self, command) -> Tuple[Status, bool]:
+        status = self.execute_command(self.current_player, command)
+        return status, self.is_done()
+
+    def snapshot(self) -> tuple:
+        '''
+        Immutable and hashable copy of the position:
+        (current player index, turn, dices, route, homes, places)
+        route holds piece codes (index in `self.pieces`), homes hold piece indexes,
+        places holds Piece.place of every piece and -1 marks an empty location.
+        '''
+        route = [-1] * len(self.route)
+        for piece, location in self.route.locations.items():
+            route[location] = self.piece_codes[piece]
+
+        homes = []
+        for home in self.homes:
+            home_state = [-1] * len(home)
+            for piece, location in home.locations.items():
+                home_state[location] = piece.index
+            homes.append(tuple(home_state))
+
+        return (
+            self.players.index(self.current_player),
+            self.turn,
+            tuple(self.current_dices),
+            tuple(route),
+            tuple(homes),
+            tuple(piece.place for piece in self.pieces),
+        )
+
+    def restore(self, snapshot: tuple):
+        current_index, turn, dices, route, homes, places = snapshot
+        self.route.load(None if code == -1 else self.pieces[code] for code in route)
+        for home, nest, home_state in zip(self.homes, self.nests, homes):
+            home.load(None if index == -1 else nest.pieces[index] for index in home_state)
+        for piece, place in zip(self.pieces, places):
+            piece.place = place
+        self.current_player = self.players[current_index]
+        self.turn = turn
+        self.set_dices(list(dices))
+
     def disconnect(self, connection: Connection):
-        player = self.find_player(connection)
-        player.set_connection(NoConnection())
+        player = self.player_of.pop(connection, None)
+        if player is not None:
+            player.set_connection(NoConnection())
 
-    def find_player(self, connection: Connection):
-        for player in self.players:
-            if player.connection == connection:  # TODO: Should based on authentication
-                return player
-        return None
+    def find_player(self, connection: Connection) -> Optional[Player]:
+        return self.player_of.get(connection, None)  # TODO: Should based on authentication
 
-    def find_home(self, current_player: Player):
-        for home in self.homes:
-            if home.player == current_player:
-                return home
-        return None
+    def find_home(self, current_player: Player) -> Optional[Home]:
+        return self.home_of.get(current_player, None)
 
-    def find_nest(self, current_player: Player):
-        for nest in self.nests:
-            if nest.player == current_player:
-                return nest
-        return None
+    def find_nest(self, current_player: Player) -> Optional[Nest]:
+        return self.nest_of.get(current_player, None)
 
     def is_done(self):
         if len(self.players) == 1:
@@ -82,114 +168,233 @@ class GameState:
                 return True
         return False
 
+    def winner(self) -> Optional[Player]:
+        for home in self.homes:
+            if home.is_finished():
+                return home.player
+        return None
+
     def _roll_dice(self):
-        self.current_dices = np.random.randint(1, 7, size=2).tolist()
+        self.set_dices(self.dice.roll())
+
+    def set_dices(self, dices: List[int]):
+        self.current_dices = dices
+        self._legal_actions = None
 
     def send_turn(self):
-        self.visualizer.visualize(self.get_turn_info())
-        self.current_player.take_turn(self.get_turn_info())
+        if self.headless:
+            return
+        if not isinstance(self.visualizer, NoVisualizer):
+            self.visualizer.visualize(self.get_turn_info())
+
+        broadcasted = self.audience.send_data(Connection.CHANNEL_TURN, self.audience_encoder.encode(self))
+        if not (broadcasted and self.current_player.connection.joins_broadcast):
+            self.current_player.take_turn(self)
+
+    def resync(self, connection: Connection):
+        if connection.joins_broadcast and not isinstance(self.audience, NoConnection):
+            connection.send_data(Connection.CHANNEL_TURN, self.audience_encoder.full(self))
+            return
+
+        player = self.find_player(connection)
+        if player is None:
+            return
+        player.turn_encoder.resync()
+        if player == self.current_player:
+            player.take_turn(self)
 
-    def process_command(self, connection: Connection, command_str: str):
+    def process_command(self, connection: Connection, command):
         player = self.find_player(connection)
         if player != self.current_player:
             print('Invalid Turn Error')
             connection.send_status(InvalidTurnError())
             return
 
+        status = self.execute_command(player, command)
+        print('Status:', status)
+        if not status.ok():
+            connection.send_status(status)
+
+    def execute_command(self, player: Player, command) -> Status:
+        '''
+        command is a text command or structured actions, see action.compile_command
+        '''
         try:
-            command = self.parse_command(self.current_player, command_str)
+            actions = compile_command(command)
         except InvalidCommandException:
-            connection.send_status(InvalidCommandError(command_str))
+            return InvalidCommandError(command)
 
-        status = command.execute()
-        print('Status:', status)
-        if status.ok():
-            self.next_turn()
-        else:
-            command.undo()
-            connection.send_status(status)
+        if player != self.current_player:
+            return InvalidTurnError()
+
+        # the legal set of the turn is the only authority on what may be played
+        self.legal_actions()
+        if actions in self._legal_set:
+            # already validated for this turn, nothing to roll back
+            self.build_command(player, actions).execute()
+            self.end_turn(actions)
+            return OK
+
+        # rejected, a trial run only finds the reason to report
+        try:
+            sequence = self.build_command(player, actions)
+        except InvalidCommandException:
+            return InvalidCommandError(command)
+
+        status = sequence.execute()
+        sequence.undo()
+        return InvalidCommandError(command) if status.ok() else status
 
     def piece_from_index(self, player, index: int):
-        for nest in self.nests:
-            if nest.player == player:
-                return nest.piece_from_index(index)
-        raise ValueError()
+        nest = self.nest_of.get(player, None)
+        if nest is None or not 0 <= index < len(nest.pieces):
+            raise ValueError()
+        return nest.piece_from_index(index)
+
+    def timeout_turn(self, seconds):
+        self.current_player.connection.send_status(TurnTimeoutError(seconds))
+        PassCommand(self.current_player).execute()
+        self.end_turn((PASS,))
+
+    def end_turn(self, actions: Tuple[Action, ...]):
+        if self.log is not None:
+            self.log.record(self, format_actions(actions))
+        self.next_turn()
 
     def next_turn(self):
+        self.turn += 1
         self._roll_dice()
         self.current_player = self.current_player.next
+        if self.log is not None:
+            self.log.begin_turn(self)
         self.send_turn()
 
     def get_turn_info(self):
         out = {}
         out['dice_values'] = self.current_dices
+        out['current_player'] = self.current_player.name
         out['homes'] = [home.to_dict() for home in self.homes]
         out['nests'] = [nest.to_dict() for nest in self.nests]
         out['route'] = self.route.to_dict()
+        out['legal_actions'] = self.legal_actions()
+        # bit packed, np.unpackbits(..., count=OBSERVATION_SIZE) restores the vector
+        out['observation'] = np.packbits(self.observe()).tobytes()
         out['metadata'] = {
-            'LANE_SIZE': self.PLAYER_LANE_SIZE
+            'LANE_SIZE': self.PLAYER_LANE_SIZE,
+            'OBSERVATION_SIZE': self.encoder.size,
         }
         return out
 
-    def parse_command(self, current_player, command_str) -> Command:
-        def norm(cmd_str: str):
-            cmd_str = re.sub(' +', ' ', cmd_str.strip())
-            return cmd_str
-
-        def parse_single_command(cmd: str):
-            parts = cmd.split(' ')
-            command_key = parts[0]
-
-            if command_key == 'move':
-                try:
-                    piece = self.piece_from_index(current_player, int(parts[1]))
-                    steps = int(parts[2])
-                except (ValueError, IndexError):
-                    raise InvalidCommandException(cmd)
-
-                home = self.find_home(current_player)
-                if home.location(piece) == home.LOC_OUT_BOARD:
-                    command = MoveRouteCommand(self.route, piece, dices, steps)
-                else:
-                    command = MoveInHomeCommand(home, piece, dices, steps)
-                return command
-
-            if command_key == 'start':
-
-                try:
-                    steps = int(parts[1])
-                except IndexError:
-                    raise InvalidCommandException(cmd)
-
-                nest = self.find_nest(current_player)
-                command = StartCommand(nest, self.route, dices, steps)
-                return command
-
-            if command_key == 'move-home':
-
-                try:
-                    piece = self.piece_from_index(current_player, int(parts[1]))
-                    steps = int(parts[2])
-                except (ValueError, IndexError):
-                    raise InvalidCommandException(cmd)
-
-                home = self.find_home(current_player)
-                command = MoveToHomeCommand(self.route, home, piece, dices, steps)
-                return command
-
-            # if command_key == 'help' or command_key == 'h':
-            #     help_str = 'HELP!!!!!!!!!!!!!!'
-            #     command = ShowHelpCommand(help_str)
-            #     return command
-
-            if command_key == 'pass' or command_key == 'p':
-                command = PassCommand(current_player)
-                return command
-
-            raise InvalidCommandException(command_str)
-
-        dices = copy.deepcopy(self.current_dices)
-        commands = [parse_single_command(norm(cmd)) for cmd in command_str.split(';')]
-        if len(commands) == 1:
-            return commands[0]
+    def observe(self, out: Optional[np.ndarray] = None, player: Optional[Player] = None) -> np.ndarray:
+        return self.encoder.encode(self, out, player)
+
+    def parse_command(self, current_player, command) -> Command:
+        return self.build_command(current_player, compile_command(command))
+
+    def build_command(self, current_player, actions: Tuple[Action, ...]) -> Command:
+        dices = list(self.current_dices)
+        commands = [self._build_single_command(current_player, action, dices) for action in actions]
+        # a sequence only rolls back the sub-commands which actually succeeded
         return CommandSequence(commands)
+
+    def _build_single_command(self, current_player, action: Action, dices: List[int]) -> Command:
+        op, index, steps = action
+
+        if op == OP_MOVE:
+            try:
+                piece = self.piece_from_index(current_player, index)
+            except (ValueError, IndexError):
+                raise InvalidCommandException(format_actions([action]))
+
+            home = self.find_home(current_player)
+            if home.location(piece) == home.LOC_OUT_BOARD:
+                command = MoveRouteCommand(self.route, piece, dices, steps)
+            else:
+                command = MoveInHomeCommand(home, piece, dices, steps)
+            return command
+
+        if op == OP_START:
+            nest = self.find_nest(current_player)
+            command = StartCommand(nest, self.route, dices, steps)
+            return command
+
+        if op == OP_MOVE_HOME:
+            try:
+                piece = self.piece_from_index(current_player, index)
+            except (ValueError, IndexError):
+                raise InvalidCommandException(format_actions([action]))
+
+            home = self.find_home(current_player)
+            command = MoveToHomeCommand(self.route, home, piece, dices, steps)
+            return command
+
+        # if command_key == 'help' or command_key == 'h':
+        #     help_str = 'HELP!!!!!!!!!!!!!!'
+        #     command = ShowHelpCommand(help_str)
+        #     return command
+
+        if op == OP_PASS:
+            command = PassCommand(current_player)
+            return command
+
+        raise InvalidCommandException(format_actions([action]))
+
+    def legal_actions(self) -> List[str]:
+        '''
+        Every command the current player can play with the current dices, in normalized form.
+        Computed once per turn.
+        '''
+        if self._legal_actions is None:
+            legal = self._generate_legal_actions()
+            self._legal_set = set(legal)
+            self._legal_actions = [format_actions(actions) for actions in legal]
+        return self._legal_actions
+
+    def legal_action_tuples(self) -> Set[Tuple[Action, ...]]:
+        self.legal_actions()
+        return self._legal_set
+
+    def legal_or_pass(self, command) -> str:
+        '''
+        Normalized form of command when it is legal this turn, otherwise pass
+        '''
+        try:
+            actions = compile_command(command)
+        except InvalidCommandException:
+            return OP_PASS
+        return format_actions(actions) if actions in self.legal_action_tuples() else OP_PASS
+
+    def _candidate_actions(self, steps_values) -> List[Action]:
+        candidates = []
+        for steps in steps_values:
+            candidates.append((OP_START, -1, steps))
+            for index in range(self.MAX_NUM_PIECE_PER_PLAYER):
+                candidates.append((OP_MOVE, index, steps))
+                candidates.append((OP_MOVE_HOME, index, steps))
+        return candidates
+
+    def _generate_legal_actions(self) -> List[Tuple[Action, ...]]:
+        player = self.current_player
+        legal = [(PASS,)]
+        for first_steps in sorted(set(self.current_dices)):
+            remaining = list(self.current_dices)
+            remaining.remove(first_steps)
+            second_candidates = self._candidate_actions(sorted(set(remaining)))
+
+            for first in self._candidate_actions([first_steps]):
+                dices = [first_steps]
+                command = self._build_single_command(player, first, dices)
+                # like build_command, every part of a sequence is built before any of them runs
+                seconds = [(second, self._build_single_command(player, second, dices))
+                           for second in second_candidates]
+                if not command.execute().ok():
+                    continue
+
+                legal.append((first,))
+                for second, second_command in seconds:
+                    dices[:] = remaining
+                    if second_command.execute().ok():
+                        legal.append((first, second))
+                        second_command.undo()
+                command.undo()
+        return legal
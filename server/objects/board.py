@@ -1,9 +1,88 @@
-from typing import List
+from typing import Dict, Iterable, List, Optional, Tuple
 
-from error import CannotMoveError, NoError, Status
+from error import OK, CannotMoveError, Status
 from player import Player
 
-from objects.piece import EmptyPiece, Piece
+from objects.piece import EMPTY_PIECE, Piece
+
+
+_RANGE_MASKS: Dict[int, List[List[int]]] = {}
+
+
+def range_masks(size: int) -> List[List[int]]:
+    '''
+    masks[from][to] has the bits of [from, to], wrapping around the end when from > to.
+    Shared by every board of the same size.
+    '''
+    def mask(from_location, to_location):
+        if from_location <= to_location:
+            return ((1 << (to_location - from_location + 1)) - 1) << from_location
+        return mask(from_location, size - 1) | mask(0, to_location)
+
+    if size not in _RANGE_MASKS:
+        _RANGE_MASKS[size] = [[mask(i, j) for j in range(size)] for i in range(size)]
+    return _RANGE_MASKS[size]
+
+
+def norm_location(size: int, location: int) -> int:
+    # -1 wraps to size - 2, the rules have always counted the route this way
+    if location < 0:
+        return location + size - 1
+
+    if location >= size:
+        return location % size
+
+    return location
+
+
+def entrance_distance(size: int, offset: int, location: int) -> int:
+    '''
+    Most steps a piece of the player starting at offset may move from location without passing its home entrance
+    '''
+    home_location = norm_location(size, offset - 1)
+
+    # Norm piece location to 0->size
+    if location < offset:
+        location += offset
+    else:
+        location -= offset
+
+    if offset > home_location:
+        home_location += size - offset
+
+    return home_location - location
+
+
+class RouteGeometry:
+    '''
+    Lookup tables shared by every route of `size` cells
+    '''
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.range_masks = range_masks(size)
+        # indexed [location][steps] for steps below size, path() covers any other value
+        self.next_cells = [[norm_location(size, location + steps) for steps in range(size)] for location in range(size)]
+        self.path_masks = [[self.path(location, steps)[1] for steps in range(size)] for location in range(size)]
+        # indexed [offset] of the player's starting cell
+        self.entrances = [norm_location(size, offset - 1) for offset in range(size)]
+        self.entrance_distances = [[entrance_distance(size, offset, location) for location in range(size)]
+                                   for offset in range(size)]
+
+    def path(self, location: int, steps: int) -> Tuple[int, int]:
+        new_location = norm_location(self.size, location + steps)
+        from_location = norm_location(self.size, location + 1)
+        to_location = norm_location(self.size, new_location - 1)
+        return new_location, self.range_masks[from_location][to_location]
+
+
+_ROUTE_GEOMETRIES: Dict[int, RouteGeometry] = {}
+
+
+def route_geometry(size: int) -> RouteGeometry:
+    if size not in _ROUTE_GEOMETRIES:
+        _ROUTE_GEOMETRIES[size] = RouteGeometry(size)
+    return _ROUTE_GEOMETRIES[size]
 
 
 class Board:
@@ -11,11 +90,28 @@ class Board:
 
     def __init__(self, route_size: int) -> None:
         self.route_size = route_size
-        self.state: List[Piece] = [EmptyPiece() for _ in range(route_size)]
+        self.state: List[Piece] = [EMPTY_PIECE] * route_size
+        self.locations: Dict[Piece, int] = {}
+        # bit i is set when location i holds a piece
+        self.occupied = 0
+        self.player_occupied: Dict[Player, int] = {}
+        self.range_masks = range_masks(route_size)
 
     def to_dict(self):
         return [piece.to_dict() for piece in self.state]
 
+    def load(self, pieces: Iterable[Optional[Piece]]):
+        '''
+        Replace the whole board, None marks an empty location
+        '''
+        self.state = [EMPTY_PIECE] * self.route_size
+        self.locations = {}
+        self.occupied = 0
+        self.player_occupied = {}
+        for location, piece in enumerate(pieces):
+            if piece is not None:
+                self.set_location(piece, location)
+
     def piece_at(self, location: int) -> Piece:
         return self.state[location]
 
@@ -26,16 +122,29 @@ class Board:
         return ' '.join([piece.name for piece in self.state])
 
     def location(self, piece: Piece):
-        try:
-            return self.state.index(piece)
-        except ValueError:
-            return self.LOC_OUT_BOARD
+        return self.locations.get(piece, self.LOC_OUT_BOARD)
+
+    def is_occupied_by(self, player: Player, location: int) -> bool:
+        return self.player_occupied.get(player, 0) >> location & 1 == 1
 
     def set_location(self, piece: Piece, new_location: int):
+        bit = 1 << new_location
+        old_piece = self.state[new_location]
+        if old_piece is not EMPTY_PIECE:
+            if self.locations.get(old_piece) == new_location:
+                del self.locations[old_piece]
+            self.player_occupied[old_piece.player] &= ~bit
+
         self.state[new_location] = piece
+        if piece is EMPTY_PIECE:
+            self.occupied &= ~bit
+        else:
+            self.locations[piece] = new_location
+            self.occupied |= bit
+            self.player_occupied[piece.player] = self.player_occupied.get(piece.player, 0) | bit
 
     def clear_location(self, location: int):
-        self.set_location(EmptyPiece(), location)
+        self.set_location(EMPTY_PIECE, location)
 
     def is_clear(self, from_location: int, to_location: int) -> bool:
         '''
@@ -46,14 +155,17 @@ class Board:
 
 class Route(Board):
 
-    def norm_location(self, location: int):
-        if location < 0:
-            return location + len(self.state) - 1
+    def __init__(self, route_size: int) -> None:
+        super().__init__(route_size)
+        self.geometry = route_geometry(route_size)
 
-        if location >= len(self.state):
-            return location % len(self.state)
+    def norm_location(self, location: int):
+        return norm_location(self.route_size, location)
 
-        return location
+    def next_location(self, location: int, steps: int) -> int:
+        if 0 <= location < self.route_size and 0 <= steps < self.route_size:
+            return self.geometry.next_cells[location][steps]
+        return norm_location(self.route_size, location + steps)
 
     def is_clear(self, from_location: int, to_location: int) -> bool:
         '''
@@ -61,56 +173,48 @@ class Route(Board):
         '''
         from_location = self.norm_location(from_location)
         to_location = self.norm_location(to_location)
-
-        if from_location <= to_location:
-            range_check = self.state[from_location:to_location + 1]
-        else:
-            range_check = self.state[from_location:] + self.state[:to_location + 1]
-        return all([isinstance(piece, EmptyPiece) for piece in range_check])
+        return not self.occupied & self.range_masks[from_location][to_location]
 
     def home_entrance_location(self, player: Player):
-        home_location = self.norm_location(player.offset - 1)
-        return home_location
+        return self.geometry.entrances[player.offset]
 
     def is_pass_home_entrance(self, piece: Piece, steps: int):
-        home_location = self.home_entrance_location(piece.player)
-        piece_location = self.location(piece)
-        player_offset = piece.player.offset
-
-        # Norm piece location to 0->len(state)
-        if piece_location < player_offset:
-            piece_location += player_offset
-        else:
-            piece_location -= player_offset
-
-        if player_offset > home_location:
-            home_location += len(self) - player_offset
-
-        return piece_location + steps > home_location
+        location = self.location(piece)
+        if location == self.LOC_OUT_BOARD:
+            return steps > entrance_distance(self.route_size, piece.player.offset, location)
+        return steps > self.geometry.entrance_distances[piece.player.offset][location]
 
     def is_at_home_entrance(self, piece: Piece):
-        return self.location(piece) == self.home_entrance_location(piece.player)
+        return self.location(piece) == self.geometry.entrances[piece.player.offset]
 
     def move(self, piece: Piece, steps: int) -> Status:
         old_location = self.location(piece)
-        new_location = self.norm_location(old_location + steps)
+        if old_location == self.LOC_OUT_BOARD:
+            return CannotMoveError(piece, steps)
+
+        geometry = self.geometry
+        if 0 <= steps < self.route_size:
+            new_location = geometry.next_cells[old_location][steps]
+            path = geometry.path_masks[old_location][steps]
+        else:
+            new_location, path = geometry.path(old_location, steps)
 
         # conditions
-        is_clear = self.is_clear(self.norm_location(old_location + 1), self.norm_location(new_location - 1))
-        is_not_same_player = piece.player != self.piece_at(new_location).player
-        is_not_pass_home = not self.is_pass_home_entrance(piece, steps)
+        is_clear = not self.occupied & path
+        is_not_same_player = not self.is_occupied_by(piece.player, new_location)
+        is_not_pass_home = steps <= geometry.entrance_distances[piece.player.offset][old_location]
 
         if is_clear and is_not_same_player and is_not_pass_home:
             self.clear_location(old_location)
             self.set_location(piece, new_location)
-            return NoError()
+            return OK
 
-        return CannotMoveError(piece.name, steps)
+        return CannotMoveError(piece, steps)
 
     def undo_move(self, piece: Piece, steps: int):
         location = self.location(piece)
         self.clear_location(location)
-        self.set_location(piece, self.norm_location(location - steps))
+        self.set_location(piece, (location - steps) % len(self))
 
 
 class Home(Board):
@@ -126,19 +230,18 @@ class Home(Board):
         if from_location > to_location:
             return False
 
-        range_check = self.state[from_location:to_location + 1]
-        return all([isinstance(piece, EmptyPiece) for piece in range_check])
+        return not self.occupied & self.range_masks[from_location][to_location]
 
     def move(self, piece: Piece, steps: int) -> Status:
         piece_location = self.location(piece)
         if piece_location == self.LOC_OUT_BOARD:
-            return CannotMoveError(piece.name, steps)
+            return CannotMoveError(piece, steps)
 
         if self.is_clear(steps - 1, steps - 1) and piece_location == steps - 2:
             self.clear_location(piece_location)
             self.set_location(piece, steps - 1)
-            return NoError()
-        return CannotMoveError(piece.name, steps)
+            return OK
+        return CannotMoveError(piece, steps)
 
     def undo_move(self, piece: Piece, steps: int):
         self.clear_location(steps - 1)
@@ -146,6 +249,5 @@ class Home(Board):
 
     def is_finished(self):
         # TODO: change to NUM_PIECE_PER_PLAYER
-        if any([isinstance(piece, EmptyPiece) for piece in self.state[-4:]]):
-            return False
-        return True
+        finished_mask = self.range_masks[len(self) - 4][len(self) - 1]
+        return self.occupied & finished_mask == finished_mask
@@ -1,10 +1,14 @@
-from error import NoError, Status
+from error import OK, Status
 from player import Player
 
 from objects.board import Route
 from objects.piece import Piece
 
 
+NOT_KICKSTART_DICE = Status(-1, 'Could not kickstart due to dice value')
+NEST_EMPTY = Status(-1, 'There is no piece left in nest')
+
+
 class Nest:
 
     MAX_PIECES = 4
@@ -18,21 +22,21 @@ class Nest:
 
     def move(self, route: Route, dice: int):
         if not (dice == 1 or dice == 6):
-            return Status(-1, 'Could not kickstart due to dice value')
+            return NOT_KICKSTART_DICE
 
-        available_flag = [piece.place == Piece.PLACE_NEST for piece in self.pieces]
-        if any(available_flag):
-            index = available_flag.index(True)
-            piece = self.pieces[index]
+        for piece in self.pieces:
+            if piece.place == Piece.PLACE_NEST:
+                break
+        else:
+            return NEST_EMPTY
 
-            piece_at_nest_door = route.piece_at(self.player.offset)
-            is_not_same_player = self.player != piece_at_nest_door.player
-            if is_not_same_player:
-                piece.set_place(Piece.PLACE_ROUTE)
-                route.set_location(piece, self.player.offset)
-                return NoError()
+        is_not_same_player = not route.is_occupied_by(self.player, self.player.offset)
+        if is_not_same_player:
+            piece.set_place(Piece.PLACE_ROUTE)
+            route.set_location(piece, self.player.offset)
+            return OK
 
-        return Status(-1, 'There is no piece left in nest')
+        return NEST_EMPTY
 
     def undo_move(self, route: Route):
         piece = route.piece_at(self.player.offset)
@@ -3,6 +3,8 @@ import player
 
 class Piece:
 
+    __slots__ = ('index', 'player', 'place')
+
     PLACE_NEST = 0
     PLACE_ROUTE = 1
     PLACE_HOME = 2
@@ -33,9 +35,27 @@ class Piece:
 
 
 class EmptyPiece(Piece):
+    '''
+    Marks an empty location, EmptyPiece() always returns the shared EMPTY_PIECE
+    '''
+
+    __slots__ = ()
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            instance = super().__new__(cls)
+            instance.index = -1
+            instance.player = None
+            cls._instance = instance
+        return cls._instance
+
     def __init__(self) -> None:
-        self.index = -1
-        self.player = None
+        pass
+
+    def __reduce__(self):
+        return EmptyPiece, ()
 
     @property
     def name(self):
@@ -45,3 +65,6 @@ class EmptyPiece(Piece):
         if isinstance(o, EmptyPiece):
             return True
         return super().__eq__(o)
+
+
+EMPTY_PIECE = EmptyPiece()
@@ -1,5 +1,7 @@
-from typing import Dict, Optional
+from typing import Optional
 from connection import Connection, PlayerConnection, NoConnection
+from delta import TurnDeltaEncoder
+from wire import PROTOCOL_BINARY, pack_turn
 
 
 __all__ = [
@@ -14,20 +16,25 @@ class Player:
         self.offset: Optional[int] = None
         self.__name = 'NONAME'
         self.next: Optional[Player] = None
+        self.turn_encoder = TurnDeltaEncoder()
 
     def init(self, connection, offset, next=None):
         # type: (Connection, int, Optional[Player]) -> None
         self.offset = offset
         self.connection = connection
         self.name = connection.username  # save in case lose connection
+        # a socket may hold several seats, its turns tell them apart by name
+        self.turn_encoder = TurnDeltaEncoder(self.name)
         self.next = next
 
     def set_next_player(self, next):
         # type: (Player,) -> None
         self.next = next
 
-    def take_turn(self, turn_info: Dict) -> bool:
-        return self.connection.send_data(PlayerConnection.CHANNEL_TURN, data=turn_info)
+    def take_turn(self, state) -> bool:
+        if self.connection.protocol == PROTOCOL_BINARY:
+            return self.connection.send_data(PlayerConnection.CHANNEL_TURN, data=pack_turn(state, self.name))
+        return self.connection.send_data(PlayerConnection.CHANNEL_TURN, data=self.turn_encoder.encode(state))
 
     def set_connection(self, connection: Connection):
         self.connection = connection
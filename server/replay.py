@@ -0,0 +1,83 @@
+import json
+from bisect import bisect_right
+from typing import Dict, List, Optional, Tuple
+
+from gamestate import GameState
+
+
+class GameReplay:
+    '''
+    Game of a GameLog file, any turn of which is rebuilt from the closest keyframe before it
+    '''
+
+    def __init__(self, path: str) -> None:
+        self.header: Dict = {}
+        self.turns: List[Tuple[List[int], str]] = []
+        self.keyframes: Dict[int, list] = {}
+        self.end: Optional[list] = None
+        self.winner: Optional[str] = None
+
+        with open(path) as file:
+            lines = iter(file)
+            self.header = json.loads(next(lines))
+            for line in lines:
+                record = json.loads(line)
+                if isinstance(record, list):
+                    turn, dices, command = record
+                    assert turn == len(self.turns), f'turn {turn} is not contiguous'
+                    self.turns.append((dices, command))
+                elif 'keyframe' in record:
+                    self.keyframes[record['keyframe'][1]] = record['keyframe']
+                elif 'end' in record:
+                    self.end = record['end']
+                    self.winner = record['winner']
+        self._keyframe_turns = sorted(self.keyframes)
+
+        self.state = GameState()
+        self.state.reset(len(self.players), seed=self.seed)
+
+    @property
+    def seed(self) -> int:
+        return self.header['seed']
+
+    @property
+    def players(self) -> List[str]:
+        return self.header['players']
+
+    @property
+    def num_turns(self) -> int:
+        return len(self.turns)
+
+    def seek(self, turn: int) -> GameState:
+        '''
+        State at the beginning of turn, before its command. num_turns is the final position.
+        The returned state is reused by the next seek.
+        '''
+        assert 0 <= turn <= self.num_turns
+        if turn == self.num_turns and self.end is not None:
+            self.state.restore(self.end)
+            return self.state
+
+        index = bisect_right(self._keyframe_turns, turn) - 1
+        assert index >= 0, 'no keyframe before this turn'
+        start = self._keyframe_turns[index]
+        self.state.restore(self.keyframes[start])
+        for dices, command in self.turns[start:turn]:
+            self.state.set_dices(list(dices))
+            status = self.state.execute_command(self.state.current_player, command)
+            assert status.ok(), f'turn {self.state.turn}: {command} {status}'
+        if turn < self.num_turns:
+            self.state.set_dices(list(self.turns[turn][0]))
+        return self.state
+
+    def __iter__(self):
+        '''
+        (state, command) of every turn in order, replayed without seeking
+        '''
+        self.seek(0)
+        for dices, command in self.turns:
+            self.state.set_dices(list(dices))
+            yield self.state, command
+            self.state.execute_command(self.state.current_player, command)
+        if self.end is not None:
+            self.state.restore(self.end)
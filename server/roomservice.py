@@ -0,0 +1,146 @@
+from typing import Callable, List
+
+from bot import BotConnection, MCTSBot, RandomBot
+from connection import Connection, NoConnection
+from error import IsPlayingError, NoError, Status
+from gamedb import GameRoomDB
+from gameroom import GameRoom
+
+MAX_ROOM_PAGE = 100
+
+
+def list_rooms(rooms, query=None) -> List[str]:
+    '''
+    Page of room names of a room service, query is an optional dict of
+    offset, limit (at most MAX_ROOM_PAGE), prefix and joinable
+    '''
+    query = query or {}
+    if not isinstance(query, dict):
+        return []
+
+    try:
+        offset = max(int(query.get('offset', 0)), 0)
+        limit = min(max(int(query.get('limit', MAX_ROOM_PAGE)), 0), MAX_ROOM_PAGE)
+    except (TypeError, ValueError):
+        return []
+    return rooms.list(offset, limit, str(query.get('prefix', '')), bool(query.get('joinable', False)))
+
+
+class LocalRoomService:
+    '''
+    Room operations behind the server events, for the rooms of this process kept in GameRoomDB.
+    audience_factory builds the broadcast connection of a room from its name,
+    spawn runs a started game in the background and bot_workers is the size of the
+    rollout pool of bots, 0 running rollouts in this process.
+    '''
+
+    BOT_TIME_BUDGET = 2  # seconds, keep below GameRoom.PLAYER_WAIT_TIMEOUT
+    MAX_BOT_MATCHES = 8  # running at once in this process
+
+    def __init__(self, audience_factory: Callable[[str], Connection], spawn: Callable, bot_workers: int = 4) -> None:
+        self.audience_factory = audience_factory
+        self.spawn = spawn
+        self.bot_workers = bot_workers
+        self.num_bot_matches = 0
+
+    def register(self, connection: Connection):
+        '''
+        Announce a connection which is not a socket.io one, rooms of this process reach it directly
+        '''
+        pass
+
+    def unregister(self, connection: Connection):
+        pass
+
+    def list(self, offset: int = 0, limit: int = 100, prefix: str = '', joinable: bool = False) -> List[str]:
+        return GameRoomDB.list(offset, limit, prefix, joinable)
+
+    def join(self, connection, room_name) -> Status:
+        status = GameRoomDB.join(connection, room_name)
+        if status.ok():
+            self._set_audience(GameRoomDB.rooms[room_name], room_name)
+        return status
+
+    def leave(self, connection, room_name) -> Status:
+        GameRoomDB.leave(connection, room_name)
+        return NoError()
+
+    def spectate(self, connection, room_name) -> Status:
+        room = GameRoomDB.rooms.get(room_name, None)
+        if room is None:
+            return Status(-1, f'Room "{room_name}" does not exist')
+
+        self._set_audience(room, room_name)
+        room.resync(connection)
+        return NoError()
+
+    def ready(self, connection, room_name) -> Status:
+        room = GameRoomDB.rooms[room_name]
+        if room.is_playing:
+            return IsPlayingError()
+
+        room.ready(connection)
+        self._start_if_able(room)
+        return NoError()
+
+    def add_bot(self, room_name) -> Status:
+        room = GameRoomDB.rooms[room_name]
+        policy = MCTSBot(time_budget=self.BOT_TIME_BUDGET, num_workers=self.bot_workers)
+        bot = BotConnection(f'bot-{len(room.connection_ready)}', policy)
+        status = room.add_bot(bot)
+        if status.ok():
+            self._start_if_able(room)
+        return status
+
+    def bot_match(self, room_name, num_bots: int = 2, record_moves: bool = False, rollouts: int = 0) -> Status:
+        '''
+        New room of num_bots bots played as fast as their policies allow, the result going to the room
+        audience. Bots search rollouts playouts per move, or play at random when it is 0.
+        '''
+        if room_name in GameRoomDB.rooms:
+            return Status(-1, f'Room "{room_name}" already exists')
+        if not GameRoom.MIN_NUM_PLAYER <= num_bots <= GameRoom.MAX_NUM_PLAYER:
+            return Status(-1, f'A game needs {GameRoom.MIN_NUM_PLAYER} to {GameRoom.MAX_NUM_PLAYER} players')
+        if self.num_bot_matches >= self.MAX_BOT_MATCHES:
+            return Status(-1, 'Too many bot matches running, try again later')
+
+        room = GameRoom(record_moves)
+        for i in range(num_bots):
+            policy = RandomBot() if rollouts <= 0 else \
+                MCTSBot(time_budget=None, rollout_budget=rollouts, num_workers=self.bot_workers)
+            room.add_bot(BotConnection(f'bot-{i}', policy))
+        GameRoomDB.add(room_name, room)
+        self._set_audience(room, room_name)
+        self.num_bot_matches += 1
+        self.spawn(self._play_bot_match, room_name, room)
+        return NoError()
+
+    def _play_bot_match(self, room_name, room: GameRoom):
+        try:
+            room.start()
+        finally:
+            GameRoomDB.remove(room_name)
+            self.num_bot_matches -= 1
+
+    def resync(self, connection, room_name) -> Status:
+        room = GameRoomDB.rooms.get(room_name, None)
+        if room is None:
+            return Status(-1, 'Not in a room')
+
+        room.resync(connection)
+        return NoError()
+
+    def command(self, connection, room_name, command_str) -> Status:
+        game = GameRoomDB.rooms.get(room_name, None)
+        if game is None:
+            return Status(-1, 'Game is None')
+
+        return game.receive_command(connection, command_str)
+
+    def _set_audience(self, room: GameRoom, room_name):
+        if isinstance(room.audience, NoConnection):
+            room.audience = self.audience_factory(room_name)
+
+    def _start_if_able(self, room: GameRoom):
+        if room.is_able_to_start():
+            self.spawn(room.start)
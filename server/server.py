@@ -1,16 +1,26 @@
-from connection import PlayerConnection
-from typing import List
-from error import IsInRoomError, IsPlayingError, NoError, Status
-from gamedb import GameRoomDB
+from argparse import ArgumentParser
+import itertools
+import os
+from connection import PlayerConnection, RoomConnection
+from typing import Dict
+from gameroom import GameRoom
+from error import IsInRoomError, NoError, Status
+from roomservice import LocalRoomService, list_rooms
+from shard import ShardedRoomService
+from tcp import TcpServer
+from wire import PROTOCOL_JSON, PROTOCOLS
 from socketio import Server, WSGIApp
 import eventlet
+import eventlet.wsgi
 
 
 class ParcheesiServer:
 
-    MAX_CAPACITY = 100
+    MAX_CAPACITY = 5000
+    MAX_SEATS = 64  # extra seats of one socket
+    MAX_BATCH = 256
 
-    def __init__(self):
+    def __init__(self, num_workers: int = 0, log_dir=None):
         self.sio = Server(logger=False)
         self.sio.on('connect', self.connect)
         self.sio.on('disconnect', self.disconnect)
@@ -19,8 +29,23 @@ class ParcheesiServer:
         self.sio.on('leave_room', self.leave_room)
         self.sio.on('ready', self.ready)
         self.sio.on('command', self.command)
+        self.sio.on('add_bot', self.add_bot)
+        self.sio.on('resync', self.resync)
+        self.sio.on('spectate', self.spectate)
+        self.sio.on('take_seat', self.take_seat)
+        self.sio.on('leave_seat', self.leave_seat)
+        self.sio.on('commands', self.commands)
+        self.sio.on('bot_match', self.bot_match)
 
-        self.connections: List[PlayerConnection] = []
+        self.connections: Dict[str, PlayerConnection] = {}
+        self._seat_ids = itertools.count()
+        self._batch_pool = eventlet.GreenPool()
+        GameRoom.LOG_DIR = log_dir
+        if num_workers > 0:
+            self.rooms = ShardedRoomService(self.sio, num_workers, log_dir)
+        else:
+            self.rooms = LocalRoomService(lambda room_name: RoomConnection(self.sio, room_name),
+                                          self.sio.start_background_task)
 
     def connect(self, sid, env, auth):
         print('connect', sid, auth)
@@ -30,12 +55,20 @@ class ParcheesiServer:
         if 'username' not in auth.keys():
             return False
 
+        # turns and commands are JSON unless the client asks for the binary frames of wire.py
+        protocol = auth.get('protocol', PROTOCOL_JSON)
+        if protocol not in PROTOCOLS:
+            return False
+
         if len(self.connections) < self.MAX_CAPACITY:
-            connection = PlayerConnection(self.sio, sid, auth['username'])
-            self.connections.append(connection)
+            connection = PlayerConnection(self.sio, sid, auth['username'], protocol)
+            self.connections[sid] = connection
             self.sio.save_session(sid, {
                 'connection': connection,
                 'room_name': None,
+                'spectating': None,
+                # extra seats by name: (connection, room name)
+                'seats': {},
             })
             return True
 
@@ -46,13 +79,14 @@ class ParcheesiServer:
         session = self.sio.get_session(sid)
         connection = session['connection']
         room_name = session['room_name']
-        self.connections.remove(connection)
+        self.connections.pop(sid, None)
         if room_name is not None:
-            GameRoomDB.leave(connection, room_name)
+            self.rooms.leave(connection, room_name)
+        for seat, seat_room_name in session['seats'].values():
+            self.rooms.leave(seat, seat_room_name)
 
-    def list_room(self, sid):
-        data = list(GameRoomDB.rooms.keys())
-        return data
+    def list_room(self, sid, query=None):
+        return list_rooms(self.rooms, query)
 
     def join_room(self, sid, room_name):
         session = self.sio.get_session(sid)
@@ -60,21 +94,52 @@ class ParcheesiServer:
             return _ack(IsInRoomError(session['room_name']))
 
         connection = session['connection']
-        status = GameRoomDB.join(connection, room_name)
+        status = self.rooms.join(connection, room_name)
         if status.ok():
             session['room_name'] = room_name
+            # a seated player gets the turns of its own room only
+            self._stop_spectating(sid, session)
+            if connection.joins_broadcast:
+                self.sio.enter_room(sid, room_name)
+        return _ack(status)
+
+    def spectate(self, sid, room_name):
+        session = self.sio.get_session(sid)
+        if session['room_name'] is not None:
+            return _ack(IsInRoomError(session['room_name']))
+
+        if not session['connection'].joins_broadcast:
+            return _ack(Status(-1, 'Spectating is only available with the JSON protocol'))
+
+        status = self.rooms.spectate(session['connection'], room_name)
+        if status.ok():
+            if session['spectating'] is not None:
+                self.sio.leave_room(sid, session['spectating'])
+            session['spectating'] = room_name
+            self.sio.enter_room(sid, room_name)
         return _ack(status)
 
     def leave_room(self, sid):
         session = self.sio.get_session(sid)
         connection = session['connection']
         room_name = session['room_name']
-        if room_name is None:
-            return _ack(Status(-1, 'Not in a room'))
+        if room_name is not None:
+            self.rooms.leave(connection, room_name)
+            if connection.joins_broadcast:
+                self.sio.leave_room(sid, room_name)
+            session['room_name'] = None
+            return _ack(NoError())
 
-        GameRoomDB.leave(connection, room_name)
-        session['room_name'] = None
-        return _ack(NoError())
+        if session['spectating'] is not None:
+            self._stop_spectating(sid, session)
+            return _ack(NoError())
+
+        return _ack(Status(-1, 'Not in a room'))
+
+    def _stop_spectating(self, sid, session):
+        if session['spectating'] is not None:
+            self.sio.leave_room(sid, session['spectating'])
+            session['spectating'] = None
 
     def ready(self, sid):
         session = self.sio.get_session(sid)
@@ -82,28 +147,130 @@ class ParcheesiServer:
         if room_name is None:
             return _ack(Status(-1, 'Not in a room'))
 
-        room = GameRoomDB.rooms[room_name]
-        if room.is_playing:
-            return _ack(IsPlayingError())
+        status = self.rooms.ready(session['connection'], room_name)
+        return _ack(status)
 
-        room.ready(session['connection'])
+    def add_bot(self, sid):
+        session = self.sio.get_session(sid)
+        room_name = session['room_name']
+        if room_name is None:
+            return _ack(Status(-1, 'Not in a room'))
 
-        if room.is_able_to_start():
-            self.sio.start_background_task(room.start)
+        status = self.rooms.add_bot(room_name)
+        return _ack(status)
 
-        return _ack(NoError())
+    def resync(self, sid, name=None):
+        session = self.sio.get_session(sid)
+        connection, room_name = session['connection'], session['room_name'] or session['spectating']
+        if name is not None:
+            connection, room_name = session['seats'].get(name, (None, None))
+        if room_name is None:
+            return _ack(Status(-1, 'Not in a room'))
+
+        status = self.rooms.resync(connection, room_name)
+        return _ack(status)
 
     def command(self, sid, command_str):
         session = self.sio.get_session(sid)
         connection = session['connection']
-        game = GameRoomDB.rooms.get(session['room_name'], None)
-        if game is None:
+        if session['room_name'] is None:
             return _ack(Status(-1, 'Game is None'))
 
-        status = game.receive_command(connection, command_str)
+        status = self.rooms.command(connection, session['room_name'], command_str)
         return _ack(status)
 
-    def listen(self, host='localhost', port=5050):
+    def bot_match(self, sid, room_name, options=None):
+        '''
+        Start a bot-only game in a new room and spectate it, its result comes on the result channel.
+        options is an optional dict of num_bots, moves (send the move log) and rollouts per move.
+        '''
+        session = self.sio.get_session(sid)
+        if session['room_name'] is not None:
+            return _ack(IsInRoomError(session['room_name']))
+        if not session['connection'].joins_broadcast:
+            return _ack(Status(-1, 'Spectating is only available with the JSON protocol'))
+
+        options = options or {}
+        try:
+            num_bots = int(options.get('num_bots', 2))
+            rollouts = int(options.get('rollouts', 0))
+            record_moves = bool(options.get('moves', False))
+        except (AttributeError, TypeError, ValueError):
+            return _ack(Status(-1, 'Invalid options'))
+
+        # spectate first, a fast game may end before the ack
+        self.sio.enter_room(sid, room_name)
+        status = self.rooms.bot_match(room_name, num_bots, record_moves, rollouts)
+        if not status.ok():
+            if room_name != session['spectating']:
+                self.sio.leave_room(sid, room_name)
+            return _ack(status)
+
+        if session['spectating'] not in (None, room_name):
+            self.sio.leave_room(sid, session['spectating'])
+        session['spectating'] = room_name
+        return _ack(status)
+
+    def take_seat(self, sid, room_name):
+        '''
+        Seat this socket once more, in any room, ready at once. The ack carries the seat name, which is
+        the stream of the turns of that seat and the key of its commands in `commands`.
+        '''
+        session = self.sio.get_session(sid)
+        connection = session['connection']
+        seats = session['seats']
+        if len(seats) >= self.MAX_SEATS:
+            return (-1, 'Too many seats', None)
+
+        name = f'{connection.username}#{next(self._seat_ids)}'
+        seat = PlayerConnection(self.sio, sid, name, connection.protocol)
+        # several seats may share a room, each one gets its own turns
+        seat.joins_broadcast = False
+        status = self.rooms.join(seat, room_name)
+        if not status.ok():
+            return (status.code, status.desc, None)
+
+        seats[name] = (seat, room_name)
+        status = self.rooms.ready(seat, room_name)
+        return (status.code, status.desc, name)
+
+    def leave_seat(self, sid, name):
+        session = self.sio.get_session(sid)
+        if name not in session['seats']:
+            return _ack(Status(-1, f'No seat "{name}"'))
+
+        seat, room_name = session['seats'].pop(name)
+        self.rooms.leave(seat, room_name)
+        return _ack(NoError())
+
+    def commands(self, sid, batch):
+        '''
+        batch is a list of [seat name, command], a null seat name meaning the room joined with join_room.
+        Commands are submitted concurrently and acked together, in the order of the batch.
+        '''
+        session = self.sio.get_session(sid)
+        if not isinstance(batch, list) or len(batch) > self.MAX_BATCH:
+            return [_ack(Status(-1, 'Invalid batch'))]
+
+        def submit(entry):
+            if not isinstance(entry, list) or len(entry) != 2:
+                return _ack(Status(-1, 'Invalid batch entry'))
+
+            name, command = entry
+            if name is None:
+                connection, room_name = session['connection'], session['room_name']
+            else:
+                connection, room_name = session['seats'].get(name, (None, None))
+            if room_name is None:
+                return _ack(Status(-1, 'Game is None'))
+            return _ack(self.rooms.command(connection, room_name, command))
+
+        return list(self._batch_pool.imap(submit, batch))
+
+    def listen(self, host='localhost', port=5050, tcp_port=None):
+        if tcp_port is not None:
+            # bots may skip socket.io and play the same rooms over raw TCP
+            eventlet.spawn_n(TcpServer(self.rooms, self.MAX_CAPACITY).listen, host, tcp_port)
         app = WSGIApp(self.sio)
         eventlet.wsgi.server(eventlet.listen((host, port)), app)
 
@@ -113,5 +280,20 @@ def _ack(status: Status):
 
 
 if __name__ == '__main__':
-    server = ParcheesiServer()
-    server.listen()
+    parser = ArgumentParser()
+    parser.add_argument('--workers', type=int, default=0,
+                        help='number of processes owning the rooms, 0 keeps every room in this process')
+    parser.add_argument('--tcp-port', type=int, default=None,
+                        help='also serve the line delimited JSON protocol of tcp.py on this port')
+    parser.add_argument('--log-dir', default=None, help='write a replayable log of every game in this directory')
+    args = parser.parse_args()
+    if args.log_dir is not None:
+        try:
+            os.makedirs(args.log_dir, exist_ok=True)
+        except OSError as exception:
+            parser.error(f'--log-dir: {exception}')
+        if not os.access(args.log_dir, os.W_OK):
+            parser.error(f'--log-dir: {args.log_dir} is not writable')
+
+    server = ParcheesiServer(args.workers, args.log_dir)
+    server.listen(tcp_port=args.tcp_port)
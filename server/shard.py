@@ -0,0 +1,254 @@
+import heapq
+import itertools
+import multiprocessing
+import os
+import pickle
+import struct
+import traceback
+import zlib
+from multiprocessing.connection import Connection as Pipe
+from typing import Dict, List, Optional
+
+import eventlet
+from eventlet.event import Event
+from eventlet.hubs import trampoline
+from eventlet.semaphore import Semaphore
+from socketio import Server
+
+from connection import Connection
+from error import Status
+from gameroom import GameRoom
+from wire import PROTOCOL_JSON
+from roomservice import LocalRoomService
+
+
+# front -> worker: (request id, operation, seat, args), worker -> front: ('reply', id, result) or ('emit', ...)
+
+
+class GreenPipe:
+    '''
+    Pipe end of length prefixed pickles, waiting in the hub instead of blocking the process
+    '''
+
+    HEADER = struct.Struct('!Q')
+
+    def __init__(self, pipe: Pipe) -> None:
+        # keeps the descriptor open
+        self.pipe = pipe
+        self.fd = pipe.fileno()
+        os.set_blocking(self.fd, False)
+        self._write_lock = Semaphore()
+
+    def send(self, message):
+        data = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+        view = memoryview(self.HEADER.pack(len(data)) + data)
+        with self._write_lock:
+            while view:
+                try:
+                    view = view[os.write(self.fd, view):]
+                except BlockingIOError:
+                    trampoline(self.fd, write=True)
+
+    def recv(self):
+        '''
+        Raises EOFError once the other end is closed
+        '''
+        size, = self.HEADER.unpack(self._read(self.HEADER.size))
+        return pickle.loads(self._read(size))
+
+    def _read(self, size: int) -> bytes:
+        chunks = []
+        while size > 0:
+            try:
+                chunk = os.read(self.fd, size)
+            except BlockingIOError:
+                trampoline(self.fd, read=True)
+                continue
+            if not chunk:
+                raise EOFError()
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b''.join(chunks)
+
+
+class PipeConnection(Connection):
+    '''
+    Socket of the front process, seen from a worker
+    '''
+
+    def __init__(self, pipe: GreenPipe, sid, username, protocol=PROTOCOL_JSON, joins_broadcast=True) -> None:
+        self.pipe = pipe
+        self.sid = sid
+        self.username = username
+        self.protocol = protocol
+        self.joins_broadcast = joins_broadcast
+
+    def send_data(self, channel, data):
+        return _send(self.pipe, ('emit', channel, data, self.sid, None))
+
+
+class PipeRoomConnection(Connection):
+
+    def __init__(self, pipe: GreenPipe, room_name) -> None:
+        self.pipe = pipe
+        self.room_name = room_name
+
+    def send_data(self, channel, data):
+        return _send(self.pipe, ('emit', channel, data, None, self.room_name))
+
+
+def _send(pipe: GreenPipe, message) -> bool:
+    try:
+        pipe.send(message)
+    except OSError:
+        return False
+    return True
+
+
+def run_worker(pipe: Pipe, log_dir: Optional[str] = None):
+    GameRoom.LOG_DIR = log_dir
+    pipe = GreenPipe(pipe)
+    # workers are daemonic and cannot own a rollout pool, rooms are already spread over cores
+    rooms = LocalRoomService(lambda room_name: PipeRoomConnection(pipe, room_name), eventlet.spawn_n, bot_workers=0)
+    # seated connections by (sid, username), kept so that a player is the same Connection on every request
+    seats: Dict[tuple, PipeConnection] = {}
+
+    def handle(request_id, operation, seat, args):
+        try:
+            result = run(operation, seat, args)
+        except Exception as exception:
+            traceback.print_exc()
+            result = [] if operation == 'list' else (-1, f'Room worker failed on {operation}: {exception!r}')
+        _send(pipe, ('reply', request_id, result))
+
+    def run(operation, seat, args):
+        if operation == 'list':
+            return rooms.list(*args)
+
+        if operation == 'add_bot' or operation == 'bot_match':
+            status = getattr(rooms, operation)(*args)
+        else:
+            key = seat[:2]
+            connection = seats.get(key) or PipeConnection(pipe, *seat)
+            status = getattr(rooms, operation)(connection, *args)
+            if operation == 'join' and status.ok():
+                seats[key] = connection
+            elif operation == 'leave':
+                seats.pop(key, None)
+        return status.code, status.desc
+
+    while True:
+        try:
+            message = pipe.recv()
+        except (EOFError, OSError):
+            # the front process is gone
+            return
+        eventlet.spawn_n(handle, *message)
+
+
+class ShardedRoomService:
+    '''
+    LocalRoomService operations relayed to the worker process owning each room
+    '''
+
+    REQUEST_TIMEOUT = 30  # seconds
+
+    def __init__(self, sio: Server, num_workers: int, log_dir: Optional[str] = None) -> None:
+        self.sio = sio
+        self.pipes: List[GreenPipe] = []
+        self._pending: Dict[int, Event] = {}
+        self._request_ids = itertools.count()
+        # connections of this process outside socket.io, such as raw TCP ones
+        self.sockets: Dict[str, Connection] = {}
+
+        context = multiprocessing.get_context('spawn')
+        for _ in range(num_workers):
+            front, back = context.Pipe()
+            context.Process(target=run_worker, args=(back, log_dir), daemon=True).start()
+            self.pipes.append(GreenPipe(front))
+            sio.start_background_task(self._read, self.pipes[-1])
+
+    def _owner(self, room_name) -> GreenPipe:
+        return self.pipes[zlib.crc32(room_name.encode()) % len(self.pipes)]
+
+    def _read(self, pipe: GreenPipe):
+        while True:
+            try:
+                message = pipe.recv()
+            except (EOFError, OSError):
+                print('Room worker exited')
+                return
+            if message[0] == 'reply':
+                _, request_id, result = message
+                event = self._pending.pop(request_id, None)
+                # None when the request already timed out
+                if event is not None:
+                    event.send(result)
+            else:
+                _, channel, data, sid, room_name = message
+                if sid in self.sockets:
+                    self.sockets[sid].send_data(channel, data)
+                else:
+                    self.sio.emit(channel, data, to=sid, room=room_name)
+
+    def _request(self, pipe: GreenPipe, operation, connection=None, *args):
+        '''
+        Result of the worker, None when it did not answer within REQUEST_TIMEOUT
+        '''
+        request_id = next(self._request_ids)
+        self._pending[request_id] = event = Event()
+        seat = None
+        if connection is not None:
+            seat = (connection.sid, connection.username, connection.protocol, connection.joins_broadcast)
+        if not _send(pipe, (request_id, operation, seat, args)):
+            self._pending.pop(request_id, None)
+            return None
+        result = event.wait(timeout=self.REQUEST_TIMEOUT)
+        self._pending.pop(request_id, None)
+        return result
+
+    def _status(self, operation, connection, room_name, *args) -> Status:
+        return _to_status(self._request(self._owner(room_name), operation, connection, room_name, *args))
+
+    def register(self, connection: Connection):
+        self.sockets[connection.sid] = connection
+
+    def unregister(self, connection: Connection):
+        self.sockets.pop(connection.sid, None)
+
+    def list(self, offset: int = 0, limit: int = 100, prefix: str = '', joinable: bool = False) -> List[str]:
+        # every worker lists its own rooms in order, the page is cut from their merge
+        pages = [self._request(pipe, 'list', None, 0, offset + limit, prefix, joinable) or [] for pipe in self.pipes]
+        return list(itertools.islice(heapq.merge(*pages), offset, offset + limit))
+
+    def join(self, connection, room_name) -> Status:
+        return self._status('join', connection, room_name)
+
+    def leave(self, connection, room_name) -> Status:
+        return self._status('leave', connection, room_name)
+
+    def spectate(self, connection, room_name) -> Status:
+        return self._status('spectate', connection, room_name)
+
+    def ready(self, connection, room_name) -> Status:
+        return self._status('ready', connection, room_name)
+
+    def add_bot(self, room_name) -> Status:
+        return _to_status(self._request(self._owner(room_name), 'add_bot', None, room_name))
+
+    def bot_match(self, room_name, num_bots: int = 2, record_moves: bool = False, rollouts: int = 0) -> Status:
+        return _to_status(self._request(self._owner(room_name), 'bot_match', None,
+                                        room_name, num_bots, record_moves, rollouts))
+
+    def resync(self, connection, room_name) -> Status:
+        return self._status('resync', connection, room_name)
+
+    def command(self, connection, room_name, command_str) -> Status:
+        return self._status('command', connection, room_name, command_str)
+
+
+def _to_status(result) -> Status:
+    if result is None:
+        return Status(-1, 'Room worker did not answer')
+    code, desc = result
+    return Status(code, desc)
@@ -0,0 +1,180 @@
+import base64
+import inspect
+import itertools
+import json
+import socket
+from typing import Dict
+
+import eventlet
+from eventlet.semaphore import Semaphore
+
+from connection import Connection
+from error import IsInRoomError, NoError, Status
+from roomservice import list_rooms
+from wire import PROTOCOL_LINES
+
+
+class TcpConnection(Connection):
+    '''
+    Raw socket of a line protocol client
+    '''
+
+    protocol = PROTOCOL_LINES
+
+    def __init__(self, sock: socket.socket, sid, username) -> None:
+        self.sock = sock
+        self.sid = sid
+        self.username = username
+        # game and request green threads both write to the socket
+        self._write_lock = Semaphore()
+
+    def send_data(self, channel, data):
+        return self.write({'event': channel, 'data': data})
+
+    def write(self, message) -> bool:
+        line = json.dumps(message, default=_encode_bytes).encode() + b'\n'
+        try:
+            with self._write_lock:
+                self.sock.sendall(line)
+        except OSError:
+            return False
+        return True
+
+
+def _encode_bytes(value):
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+class TcpServer:
+    '''
+    Line delimited JSON endpoint for bots, with the operations of ParcheesiServer on the same rooms
+    '''
+
+    def __init__(self, rooms, capacity: int) -> None:
+        self.rooms = rooms
+        self.capacity = capacity
+        self.connections: Dict[str, TcpConnection] = {}
+        self._ids = itertools.count()
+        self.operations = {
+            'list_room': self.list_room,
+            'join_room': self.join_room,
+            'leave_room': self.leave_room,
+            'ready': self.ready,
+            'command': self.command,
+            'add_bot': self.add_bot,
+            'resync': self.resync,
+        }
+
+    def listen(self, host='localhost', port=5051):
+        listener = eventlet.listen((host, port))
+        pool = eventlet.GreenPool(self.capacity)
+        while True:
+            sock, _ = listener.accept()
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            pool.spawn_n(self.handle, sock)
+
+    def handle(self, sock: socket.socket):
+        reader = sock.makefile('rb')
+        session = None
+        try:
+            auth = _read_message(reader)
+            if not isinstance(auth, dict) or 'username' not in auth.keys():
+                return
+            if len(self.connections) >= self.capacity:
+                return
+
+            connection = TcpConnection(sock, f'tcp-{next(self._ids)}', str(auth['username']))
+            self.connections[connection.sid] = connection
+            self.rooms.register(connection)
+            session = {'connection': connection, 'room_name': None}
+            connection.write({'event': 'connect', 'data': connection.sid})
+
+            for line in reader:
+                try:
+                    message = json.loads(line)
+                    if not isinstance(message.get('op'), str):
+                        raise ValueError(line)
+                    operation = self.operations.get(message['op'], None)
+                    args = message.get('args', [])
+                    args = args if isinstance(args, list) else [args]
+                except (ValueError, AttributeError):
+                    connection.write({'id': None, 'result': _ack(Status(-1, 'Malformed message'))})
+                    continue
+
+                if operation is None:
+                    result = _ack(Status(-1, f'Unknown operation "{message.get("op")}"'))
+                elif not _accepts(operation, session, args):
+                    result = _ack(Status(-1, f'Invalid arguments for "{message["op"]}"'))
+                else:
+                    result = operation(session, *args)
+                connection.write({'id': message.get('id', None), 'result': result})
+        except (OSError, ValueError):
+            pass
+        finally:
+            if session is not None:
+                connection = session['connection']
+                if session['room_name'] is not None:
+                    self.rooms.leave(connection, session['room_name'])
+                self.rooms.unregister(connection)
+                self.connections.pop(connection.sid, None)
+            sock.close()
+
+    def list_room(self, session, query=None):
+        return list_rooms(self.rooms, query)
+
+    def join_room(self, session, room_name):
+        if session['room_name'] is not None:
+            return _ack(IsInRoomError(session['room_name']))
+
+        status = self.rooms.join(session['connection'], str(room_name))
+        if status.ok():
+            session['room_name'] = str(room_name)
+        return _ack(status)
+
+    def leave_room(self, session):
+        if session['room_name'] is None:
+            return _ack(Status(-1, 'Not in a room'))
+
+        self.rooms.leave(session['connection'], session['room_name'])
+        session['room_name'] = None
+        return _ack(NoError())
+
+    def ready(self, session):
+        if session['room_name'] is None:
+            return _ack(Status(-1, 'Not in a room'))
+        return _ack(self.rooms.ready(session['connection'], session['room_name']))
+
+    def command(self, session, command):
+        if session['room_name'] is None:
+            return _ack(Status(-1, 'Game is None'))
+        return _ack(self.rooms.command(session['connection'], session['room_name'], command))
+
+    def add_bot(self, session):
+        if session['room_name'] is None:
+            return _ack(Status(-1, 'Not in a room'))
+        return _ack(self.rooms.add_bot(session['room_name']))
+
+    def resync(self, session):
+        if session['room_name'] is None:
+            return _ack(Status(-1, 'Not in a room'))
+        return _ack(self.rooms.resync(session['connection'], session['room_name']))
+
+
+def _accepts(operation, session, args) -> bool:
+    # checked before the call, a TypeError raised by the operation itself is a bug to surface
+    try:
+        inspect.signature(operation).bind(session, *args)
+    except TypeError:
+        return False
+    return True
+
+
+def _read_message(reader):
+    line = reader.readline()
+    return json.loads(line) if line else None
+
+
+def _ack(status: Status):
+    return status.code, status.desc
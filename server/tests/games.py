@@ -0,0 +1,20 @@
+import random
+
+from gamestate import GameState
+
+
+def play_random(state: GameState, rng: random.Random, num_turns: int):
+    # moves are preferred over passing, random play would hardly leave the nests otherwise
+    for _ in range(num_turns):
+        if state.is_done():
+            return
+        actions = state.legal_actions()
+        moves = [action for action in actions if action != 'pass']
+        state.step(rng.choice(moves or actions))
+
+
+def random_game(num_players: int, seed: int, num_turns: int) -> GameState:
+    state = GameState()
+    state.reset(num_players, seed=seed)
+    play_random(state, random.Random(seed), num_turns)
+    return state
@@ -0,0 +1,52 @@
+import pytest
+
+from action import OP_MOVE, OP_MOVE_HOME, OP_START, PASS, compile_command, format_actions, parse_actions
+from error import InvalidCommandError
+from exception import InvalidCommandException
+from games import random_game
+
+
+@pytest.mark.parametrize('command, actions', [
+    ('move 1 3', ((OP_MOVE, 1, 3),)),
+    ('  move   1  3 ', ((OP_MOVE, 1, 3),)),
+    ('start 6', ((OP_START, -1, 6),)),
+    ('move-home 2 4', ((OP_MOVE_HOME, 2, 4),)),
+    ('p', (PASS,)),
+    ('pass', (PASS,)),
+    ('move 1 3;start 6', ((OP_MOVE, 1, 3), (OP_START, -1, 6))),
+    ({'op': 'move', 'piece': 1, 'steps': 3}, ((OP_MOVE, 1, 3),)),
+    ({'op': 'start', 'steps': 6}, ((OP_START, -1, 6),)),
+    ({'op': 'pass'}, (PASS,)),
+    ([{'op': 'move', 'piece': 0, 'steps': 2}, {'op': 'move-home', 'piece': 3, 'steps': 5}],
+     ((OP_MOVE, 0, 2), (OP_MOVE_HOME, 3, 5))),
+])
+def test_compile_command_forms(command, actions):
+    assert compile_command(command) == actions
+
+
+@pytest.mark.parametrize('command', [
+    '', 'jump', 'move 1', 'move a 3', 'start', 'p 1',
+    {'op': 'move', 'piece': True, 'steps': 3},
+    {'op': 'start', 'steps': False},
+    {'op': 'move', 'piece': '1', 'steps': 3},
+    {'op': 'fly'},
+    {'piece': 1},
+    [], [{'op': 'move', 'piece': 1, 'steps': 3}, 'start 6'],
+    None, 3,
+])
+def test_compile_command_rejects_malformed_commands(command):
+    with pytest.raises(InvalidCommandException):
+        compile_command(command)
+
+
+def test_format_actions_normalizes_commands():
+    assert format_actions(parse_actions('  move  1 3 ;  start 6')) == 'move 1 3;start 6'
+    assert format_actions(parse_actions('p')) == 'pass'
+
+
+@pytest.mark.parametrize('command', ['move 4 3', 'move -1 3', 'move-home 7 2',
+                                     {'op': 'move', 'piece': 9, 'steps': 1}])
+def test_out_of_range_pieces_are_invalid_commands(command):
+    state = random_game(2, seed=1, num_turns=10)
+    status = state.execute_command(state.current_player, command)
+    assert status.code == InvalidCommandError.code
@@ -0,0 +1,9 @@
+import numpy as np
+
+from batchsim import cross_check
+
+
+def test_batch_matches_game_state():
+    np.random.seed(0)
+    cross_check(num_games=16, num_steps=300, num_players=2)
+    cross_check(num_games=16, num_steps=300, num_players=4)
@@ -0,0 +1,61 @@
+import random
+
+from games import play_random
+from gamestate import GameState
+from objects.piece import EMPTY_PIECE
+
+
+def assert_index_consistent(board):
+    pieces = {piece: location for location, piece in enumerate(board.state) if piece is not EMPTY_PIECE}
+    assert board.locations == pieces
+    for piece, location in pieces.items():
+        assert board.location(piece) == location
+
+
+def test_location_index_stays_consistent_after_captures():
+    captures = 0
+    for seed in range(10):
+        state = GameState()
+        state.reset(4, seed=seed)
+        rng = random.Random(seed)
+        for _ in range(400):
+            if state.is_done():
+                break
+            player = state.current_player
+            opponents = [piece for piece in state.route.locations if piece.player != player]
+            play_random(state, rng, 1)
+            captures += sum(piece not in state.route.locations for piece in opponents)
+            for board in [state.route] + state.homes:
+                assert_index_consistent(board)
+            for piece in opponents:
+                if piece not in state.route.locations:
+                    assert state.route.location(piece) == state.route.LOC_OUT_BOARD
+    assert captures > 0
+
+
+def assert_masks_consistent(board):
+    pieces = {location: piece for location, piece in enumerate(board.state) if piece is not EMPTY_PIECE}
+    assert board.occupied == sum(1 << location for location in pieces)
+    for player in {piece.player for piece in pieces.values()} | set(board.player_occupied):
+        expected = sum(1 << location for location, piece in pieces.items() if piece.player == player)
+        assert board.player_occupied.get(player, 0) == expected
+
+
+def test_occupancy_masks_match_the_cells():
+    state = GameState()
+    state.reset(4, seed=1)
+    rng = random.Random(1)
+    route = state.route
+    size = len(route)
+    for _ in range(300):
+        if state.is_done():
+            break
+        play_random(state, rng, 1)
+        for board in [route] + state.homes:
+            assert_masks_consistent(board)
+
+        from_location, to_location = rng.randrange(size), rng.randrange(size)
+        cells = range(from_location, to_location + 1) if from_location <= to_location else \
+            list(range(from_location, size)) + list(range(0, to_location + 1))
+        assert route.is_clear(from_location, to_location) == \
+            all(route.piece_at(location) is EMPTY_PIECE for location in cells)
@@ -0,0 +1,27 @@
+import pytest
+
+from dataset import NUM_ACTIONS, TrajectoryWriter, game_columns
+from gamestate import GameState
+
+
+def test_game_without_turns_has_no_rows(tmp_path):
+    state = GameState()
+    state.reset(2)
+    columns = game_columns(iter([]), state)
+    assert columns['obs'].shape == (0, (state.encoder.size + 7) // 8)
+    assert columns['legal'].shape == (0, (NUM_ACTIONS + 7) // 8)
+
+    writer = TrajectoryWriter(str(tmp_path), 2)
+    writer.add_game(columns)
+    writer.close()
+    assert writer.num_games == 0
+
+
+def test_writer_refuses_another_player_count(tmp_path):
+    state = GameState()
+    state.reset(3)
+    columns = game_columns(iter([(state, state.legal_actions()[0])]), state)
+
+    writer = TrajectoryWriter(str(tmp_path), 2)
+    with pytest.raises(ValueError):
+        writer.add_game(columns)
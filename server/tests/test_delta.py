@@ -0,0 +1,79 @@
+import random
+
+from delta import TurnDeltaEncoder
+from games import play_random, random_game
+
+
+def apply_turn(game, data) -> bool:
+    # what a client does with the turns of one stream, see client/client.py
+    if data['full']:
+        game.clear()
+        game.update(data)
+        return True
+    if game.get('seq') != data['seq'] - 1:
+        return False
+    for location, piece in data['route']:
+        game['route'][location] = piece
+    for index, location, piece in data['homes']:
+        game['homes'][index][location] = piece
+    for key in ('seq', 'dice_values', 'current_player', 'legal_actions', 'observation'):
+        game[key] = data[key]
+    return True
+
+
+def assert_same_turn(game, state):
+    info = state.get_turn_info()
+    for key in ('route', 'homes', 'dice_values', 'current_player', 'legal_actions', 'observation'):
+        assert game[key] == info[key], key
+
+
+def test_deltas_rebuild_every_full_turn():
+    state = random_game(3, seed=2, num_turns=0)
+    encoder = TurnDeltaEncoder('A')
+    rng = random.Random(2)
+    game = {}
+    num_deltas = 0
+    for seq in range(1, 150):
+        data = encoder.encode(state)
+        assert data['seq'] == seq and data['stream'] == 'A'
+        num_deltas += not data['full']
+        assert apply_turn(game, data)
+        assert_same_turn(game, state)
+        play_random(state, rng, 1)
+    assert num_deltas == 148
+
+
+def test_missed_turn_is_detected_and_resynced():
+    state = random_game(2, seed=4, num_turns=0)
+    encoder = TurnDeltaEncoder()
+    rng = random.Random(4)
+    game = {}
+    assert apply_turn(game, encoder.encode(state))
+    play_random(state, rng, 1)
+    encoder.encode(state)  # lost on the way
+    play_random(state, rng, 1)
+    assert not apply_turn(game, encoder.encode(state))
+
+    encoder.resync()
+    play_random(state, rng, 1)
+    data = encoder.encode(state)
+    assert data['full']
+    assert apply_turn(game, data)
+    assert_same_turn(game, state)
+
+
+def test_full_turn_joins_a_shared_stream():
+    state = random_game(2, seed=6, num_turns=0)
+    encoder = TurnDeltaEncoder()
+    rng = random.Random(6)
+    for _ in range(5):
+        encoder.encode(state)
+        play_random(state, rng, 1)
+    encoder.encode(state)
+
+    # a spectator joining now gets the last turn in full, then follows the deltas
+    game = {}
+    assert apply_turn(game, encoder.full(state))
+    play_random(state, rng, 1)
+    assert apply_turn(game, encoder.encode(state))
+    assert_same_turn(game, state)
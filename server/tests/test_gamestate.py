@@ -0,0 +1,59 @@
+import random
+
+import pytest
+
+from action import format_actions
+from dataset import ACTIONS
+from exception import InvalidCommandException
+from gamestate import GameState
+from games import play_random, random_game
+
+
+def positions(num_players: int, seed: int, num_turns: int = 150):
+    state = GameState()
+    state.reset(num_players, seed=seed)
+    rng = random.Random(seed)
+    for _ in range(num_turns):
+        if state.is_done():
+            return
+        yield state
+        play_random(state, rng, 1)
+
+
+def accepted_actions(state: GameState):
+    # trial run of every action of the action space, independent of the legal move generator
+    accepted = set()
+    for actions in ACTIONS:
+        try:
+            command = state.build_command(state.current_player, actions)
+        except InvalidCommandException:
+            continue
+        if command.execute().ok():
+            accepted.add(actions)
+        command.undo()
+    return accepted
+
+
+def board_position(state: GameState):
+    boards = [state.route] + state.homes
+    return [list(board.state) for board in boards], [piece.place for piece in state.pieces], list(state.current_dices)
+
+
+@pytest.mark.parametrize('num_players', [2, 3, 4])
+def test_legal_actions_are_the_accepted_commands(num_players):
+    for state in positions(num_players, seed=num_players):
+        position = board_position(state)
+        legal = set(state.legal_actions())
+        accepted = {format_actions(actions) for actions in accepted_actions(state)}
+        assert legal == accepted, state.turn
+        # generating and trying moves leaves the position untouched
+        assert board_position(state) == position
+
+
+@pytest.mark.parametrize('num_players', [2, 4])
+def test_execute_command_accepts_only_legal_actions(num_players):
+    legal = set(random_game(num_players, seed=7, num_turns=40).legal_actions())
+    for command in ['pass', 'start 6', 'move 0 1', 'move 1 3;start 6', 'move-home 2 2', 'move 5 3', 'jump']:
+        state = random_game(num_players, seed=7, num_turns=40)
+        status = state.execute_command(state.current_player, command)
+        assert status.ok() == (command in legal), command
@@ -0,0 +1,43 @@
+import random
+
+from gamelog import GameLog
+from gamestate import GameState
+from replay import GameReplay
+
+
+def logged_game(path, num_players=3, seed=5, num_turns=200):
+    '''
+    Plays a logged game, returns the snapshot taken before every turn and the final one
+    '''
+    state = GameState()
+    state.log = GameLog(str(path), keyframe_interval=16)
+    state.reset(num_players, seed=seed)
+    rng = random.Random(seed)
+    snapshots = []
+    while not state.is_done() and state.turn < num_turns:
+        snapshots.append(state.snapshot())
+        actions = state.legal_actions()
+        moves = [action for action in actions if action != 'pass']
+        state.step(rng.choice(moves or actions))
+    snapshots.append(state.snapshot())
+    state.log.close(state)
+    return snapshots
+
+
+def test_seek_reproduces_logged_states(tmp_path):
+    snapshots = logged_game(tmp_path / 'game.jsonl')
+    replay = GameReplay(str(tmp_path / 'game.jsonl'))
+    assert replay.num_turns == len(snapshots) - 1
+    assert len(replay.keyframes) > 1
+
+    # out of order, across and on keyframes
+    for turn in [replay.num_turns, 0, 37, 16, 15, 120, 1, replay.num_turns - 1]:
+        assert replay.seek(turn).snapshot() == snapshots[turn], turn
+
+
+def test_iteration_reproduces_logged_states(tmp_path):
+    snapshots = logged_game(tmp_path / 'game.jsonl', num_players=2, seed=9)
+    replay = GameReplay(str(tmp_path / 'game.jsonl'))
+    turns = [state.snapshot() for state, _ in replay]
+    assert turns == snapshots[:-1]
+    assert replay.state.snapshot() == snapshots[-1]
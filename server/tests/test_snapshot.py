@@ -0,0 +1,45 @@
+import random
+
+import numpy as np
+
+from gamestate import GameState
+from games import play_random, random_game
+
+
+def test_restore_of_snapshot_round_trips():
+    state = random_game(3, seed=11, num_turns=60)
+    snapshot = state.snapshot()
+    legal = state.legal_actions()
+    observation = state.observe().copy()
+
+    play_random(state, random.Random(12), 60)
+    assert state.snapshot() != snapshot
+    state.restore(snapshot)
+    assert state.snapshot() == snapshot
+    assert state.legal_actions() == legal
+    assert np.array_equal(state.observe(), observation)
+
+    other = GameState()
+    other.reset(3)
+    other.restore(snapshot)
+    assert other.snapshot() == snapshot
+    assert other.legal_actions() == legal
+
+
+def test_restored_state_plays_like_the_original():
+    state = random_game(2, seed=3, num_turns=30)
+    other = GameState()
+    other.reset(2)
+    other.restore(state.snapshot())
+
+    rng = random.Random(5)
+    for _ in range(100):
+        if state.is_done():
+            break
+        dices = [rng.randint(1, 6), rng.randint(1, 6)]
+        state.set_dices(list(dices))
+        other.set_dices(list(dices))
+        command = rng.choice(state.legal_actions())
+        assert state.step(command) == other.step(command)
+        # both roll their own dices for the next turn, only the board has to agree
+        assert state.snapshot()[3:] == other.snapshot()[3:]
@@ -0,0 +1,46 @@
+import importlib.util
+import os
+
+import pytest
+
+from action import compile_command, format_actions, pack_actions, unpack_actions
+from dataset import ACTIONS
+from games import random_game
+from wire import pack_turn
+
+# the client module shares its name with server/wire.py
+_spec = importlib.util.spec_from_file_location(
+    'client_wire', os.path.join(os.path.dirname(__file__), '..', '..', 'client', 'wire.py'))
+client_wire = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(client_wire)
+
+
+def test_every_action_round_trips_through_codes():
+    for actions in ACTIONS:
+        data = client_wire.pack_command(format_actions(actions))
+        assert data == pack_actions(actions)
+        assert unpack_actions(data) == actions
+        assert compile_command(data) == actions
+        assert client_wire.format_actions(data) == format_actions(actions)
+
+
+@pytest.mark.parametrize('command', ['move 5 3', 'move 0 9', 'start 14', 'start 0', 'move-home -1 2',
+                                     'move 1', 'jump', 'pass;pass;pass'])
+def test_pack_command_rejects_malformed_commands(command):
+    with pytest.raises(ValueError):
+        client_wire.pack_command(command)
+
+
+@pytest.mark.parametrize('num_players', [2, 3, 4])
+def test_turn_round_trips_through_a_frame(num_players):
+    state = random_game(num_players, seed=num_players, num_turns=80)
+    current, turn, dices, route, homes, places = state.snapshot()
+    out = client_wire.unpack_turn(pack_turn(state, 'bot#1'))
+    assert out['stream'] == 'bot#1'
+    assert out['turn'] == turn
+    assert out['current_player'] == current
+    assert out['dice_values'] == list(dices)
+    assert out['route'] == list(route)
+    assert out['homes'] == [list(home) for home in homes]
+    assert out['places'] == list(places)
+    assert out['legal_actions'] == state.legal_actions()
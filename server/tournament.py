@@ -0,0 +1,173 @@
+import importlib
+import itertools
+import math
+import random
+import time
+from argparse import ArgumentParser
+from multiprocessing import Pool, cpu_count
+from typing import Callable, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from bot import evaluate
+from gamestate import GameState
+
+
+# short names of the policies shipped with the server, others are given as module:factory
+POLICY_ALIASES = {
+    'random': 'bot:RandomBot',
+    'mcts': 'bot:fast_mcts',
+}
+
+_policies: Dict[str, Callable] = {}
+
+
+def load_policy(spec: str) -> Callable:
+    '''
+    Policy built by the factory named by spec ("module:factory" or an alias), once per process
+    '''
+    if spec not in _policies:
+        module_name, _, factory_name = POLICY_ALIASES.get(spec, spec).partition(':')
+        factory = getattr(importlib.import_module(module_name), factory_name)
+        _policies[spec] = factory()
+    return _policies[spec]
+
+
+def play_game(specs: Sequence[str], seed: int, max_turns: int) -> Tuple[int, int, bool]:
+    '''
+    One game with a seat per spec, returns (winning seat or -1 for a draw, turns, adjudicated).
+    A game still running after max_turns goes to the seat with the best evaluate() share.
+    '''
+    random.seed(seed)
+    np.random.seed(seed % 2 ** 32)
+    policies = [load_policy(spec) for spec in specs]
+
+    state = GameState()
+    state.reset(len(specs), seed=seed)
+    seats = {player: seat for seat, player in enumerate(state.players)}
+    while not state.is_done() and state.turn < max_turns:
+        state.step(state.legal_or_pass(policies[seats[state.current_player]](state)))
+
+    winner = state.winner()
+    if winner is not None:
+        return seats[winner], state.turn, False
+
+    scores = evaluate(state)
+    best = max(scores)
+    return (scores.index(best) if scores.count(best) == 1 else -1), state.turn, True
+
+
+def _play(task):
+    return play_game(*task)
+
+
+def wilson_interval(wins: int, games: int, z: float = 1.96) -> Tuple[float, float]:
+    if games == 0:
+        return 0.0, 1.0
+    rate = wins / games
+    center = (rate + z * z / (2 * games)) / (1 + z * z / games)
+    margin = z * math.sqrt(rate * (1 - rate) / games + z * z / (4 * games * games)) / (1 + z * z / games)
+    return max(center - margin, 0.0), min(center + margin, 1.0)
+
+
+class Tournament:
+    '''
+    Entrants are policy specs, a spec may enter several times. Tables of `seats` entrants play
+    `games` games each with the seats rotated between games; every game has its own seed so
+    results do not depend on how the pool schedules them.
+    '''
+
+    def __init__(self, entrants: List[str], seats: int = 2, games: int = 10, max_turns: int = 1000,
+                 seed: int = 0, num_workers: int = cpu_count()) -> None:
+        assert GameState.MAX_NUM_PLAYER >= seats >= 2 and len(entrants) >= seats
+        self.entrants = entrants
+        self.seats = seats
+        self.games = games
+        self.max_turns = max_turns
+        self.seed = seed
+        self.num_workers = num_workers
+        self.wins = [0] * len(entrants)
+        self.draws = [0] * len(entrants)
+        self.played = [0] * len(entrants)
+        self.num_games = 0
+        self.num_adjudicated = 0
+        self.num_turns = 0
+        self.elapsed = 0.0
+        self._rng = random.Random(seed)
+
+    def round_robin(self):
+        self._play_tables(list(itertools.combinations(range(len(self.entrants)), self.seats)))
+
+    def swiss(self, rounds: int):
+        '''
+        Every round seats entrants of similar score together, the lowest ones sitting out when they do not fill a table
+        '''
+        for _ in range(rounds):
+            order = sorted(range(len(self.entrants)), key=lambda i: (-self.score(i), self._rng.random()))
+            num_tables = len(order) // self.seats
+            self._play_tables([tuple(order[i * self.seats:(i + 1) * self.seats]) for i in range(num_tables)])
+
+    def score(self, entrant: int) -> float:
+        return self.wins[entrant] + self.draws[entrant] / 2
+
+    def _play_tables(self, tables: List[Tuple[int, ...]]):
+        tasks, seatings = [], []
+        for table in tables:
+            for game in range(self.games):
+                shift = game % self.seats
+                seating = table[shift:] + table[:shift]
+                seed = self.seed * 1000003 + self.num_games + len(tasks)
+                tasks.append(([self.entrants[i] for i in seating], seed, self.max_turns))
+                seatings.append(seating)
+
+        start = time.perf_counter()
+        if self.num_workers > 1:
+            with Pool(self.num_workers) as pool:
+                results = pool.map(_play, tasks, chunksize=max(len(tasks) // (4 * self.num_workers), 1))
+        else:
+            results = [_play(task) for task in tasks]
+        self.elapsed += time.perf_counter() - start
+
+        for seating, (winner, turns, adjudicated) in zip(seatings, results):
+            for entrant in seating:
+                self.played[entrant] += 1
+                if winner == -1:
+                    self.draws[entrant] += 1
+            if winner != -1:
+                self.wins[seating[winner]] += 1
+            self.num_games += 1
+            self.num_turns += turns
+            self.num_adjudicated += adjudicated
+
+    def report(self) -> str:
+        lines = [f'{"entrant":<24}{"games":>7}{"wins":>7}{"draws":>7}{"win rate":>10}{"95% CI":>18}']
+        for i in sorted(range(len(self.entrants)), key=lambda i: -self.wins[i] / max(self.played[i], 1)):
+            low, high = wilson_interval(self.wins[i], self.played[i])
+            rate = self.wins[i] / max(self.played[i], 1)
+            lines.append(f'{f"{i}:{self.entrants[i]}":<24}{self.played[i]:>7}{self.wins[i]:>7}{self.draws[i]:>7}'
+                         f'{rate:>10.3f}{f"[{low:.3f}, {high:.3f}]":>18}')
+        lines.append(f'{self.num_games} games ({self.num_adjudicated} adjudicated at {self.max_turns} turns), '
+                     f'{self.num_games / max(self.elapsed, 1e-9):.1f} games/s, '
+                     f'{self.num_turns / max(self.elapsed, 1e-9):.0f} turns/s')
+        return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Play policies against each other and report their win rates')
+    parser.add_argument('entrants', nargs='+',
+                        help='policies as module:factory, factory() returning a callable, '
+                             f'or one of {list(POLICY_ALIASES)}')
+    parser.add_argument('--seats', type=int, default=2, help='players per game, 2 to 4')
+    parser.add_argument('--games', type=int, default=10, help='games per table')
+    parser.add_argument('--swiss', type=int, default=0, help='play this many Swiss rounds instead of a round robin')
+    parser.add_argument('--max-turns', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=cpu_count())
+    args = parser.parse_args()
+
+    tournament = Tournament(args.entrants, args.seats, args.games, args.max_turns, args.seed, args.workers)
+    if args.swiss > 0:
+        tournament.swiss(args.swiss)
+    else:
+        tournament.round_robin()
+    print(tournament.report())
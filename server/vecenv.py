@@ -0,0 +1,221 @@
+import time
+from argparse import ArgumentParser
+from multiprocessing import Pipe, Process, cpu_count
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from action import OP_PASS, format_actions
+from dataset import ACTIONS, NUM_ACTIONS, legal_mask
+from encoder import ObservationEncoder
+from gamestate import GameState
+
+
+# command string of every action index
+COMMANDS = [format_actions(actions) for actions in ACTIONS]
+
+# name: (dtype, width or None for a scalar per environment)
+BUFFERS = {
+    'obs': (np.uint8, 'obs'),  # observation of the seat to play
+    'final_obs': (np.uint8, 'obs'),  # last observation of the acting seat when its game ended, before the reset
+    'legal': (np.bool_, 'legal'),  # mask over dataset.ACTIONS of the seat to play
+    'action': (np.int16, None),
+    'reward': (np.float32, None),  # 1 when the action won the game
+    'terminated': (np.bool_, None),
+    'truncated': (np.bool_, None),  # max_turns reached without a winner
+    'seat': (np.int8, None),  # seat to play
+    'winner': (np.int8, None),  # seat that won the game just ended, -1 otherwise
+}
+
+
+class _Envs:
+    '''
+    Games [start, stop) of a VectorEnv, reading and writing its arrays in place
+    '''
+
+    def __init__(self, arrays: Dict[str, np.ndarray], start: int, stop: int, num_envs: int,
+                 num_players: int, max_turns: int, seed: int) -> None:
+        self.arrays = {name: array[start:stop] for name, array in arrays.items()}
+        self.env_ids = range(start, stop)
+        self.num_envs = num_envs
+        self.num_players = num_players
+        self.max_turns = max_turns
+        self.seed = seed
+        self.states = [GameState() for _ in self.env_ids]
+        self.num_games = [0] * len(self.states)
+
+    def reset(self):
+        for i in range(len(self.states)):
+            self._reset(i)
+
+    def _reset(self, i: int):
+        # every game has its own seed whatever the number of workers
+        seed = self.seed + self.num_games[i] * self.num_envs + self.env_ids[i]
+        self.states[i].reset(self.num_players, seed=seed)
+        self.num_games[i] += 1
+        self._observe(i)
+
+    def _observe(self, i: int):
+        state, arrays = self.states[i], self.arrays
+        state.observe(out=arrays['obs'][i])
+        legal_mask(state, out=arrays['legal'][i])
+        arrays['seat'][i] = state.players.index(state.current_player)
+
+    def step(self):
+        arrays = self.arrays
+        for i, state in enumerate(self.states):
+            action = arrays['action'][i]
+            seat = arrays['seat'][i]
+            # the mask holds the legal set of the turn, anything else passes
+            command = COMMANDS[action] if 0 <= action < NUM_ACTIONS and arrays['legal'][i, action] else OP_PASS
+            _, done = state.step(command)
+
+            winner = state.winner()
+            winner_seat = state.players.index(winner) if winner is not None else -1
+            arrays['terminated'][i] = done
+            arrays['truncated'][i] = not done and state.turn >= self.max_turns
+            arrays['reward'][i] = 1.0 if winner_seat == seat else 0.0
+            arrays['winner'][i] = winner_seat
+            if arrays['terminated'][i] or arrays['truncated'][i]:
+                state.observe(out=arrays['final_obs'][i], player=state.players[seat])
+                self._reset(i)
+            else:
+                self._observe(i)
+
+
+def _run_worker(pipe, buffers: Dict[str, Tuple[str, np.dtype, tuple]], start: int, stop: int, options: Dict):
+    memories = {name: SharedMemory(memory_name) for name, (memory_name, _, _) in buffers.items()}
+    arrays = {name: np.ndarray(shape, dtype=dtype, buffer=memories[name].buf)
+              for name, (_, dtype, shape) in buffers.items()}
+    envs = _Envs(arrays, start, stop, **options)
+    try:
+        while True:
+            operation = pipe.recv()
+            if operation == 'close':
+                break
+            getattr(envs, operation)()
+            pipe.send(None)
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        # views must go before their memory is closed
+        del envs, arrays
+        for memory in memories.values():
+            memory.close()
+
+
+class VectorEnv:
+    '''
+    num_envs games stepped together over worker processes sharing their arrays, returned arrays are reused
+    '''
+
+    def __init__(self, num_envs: int, num_players: int = 2, num_workers: int = cpu_count(),
+                 max_turns: int = 1000, seed: int = 0) -> None:
+        self.num_envs = num_envs
+        self.num_players = num_players
+        self.obs_size = ObservationEncoder(num_players, GameState.PLAYER_LANE_SIZE).size
+        self.widths = {'obs': self.obs_size, 'legal': NUM_ACTIONS}
+        self.num_workers = min(num_workers, num_envs)
+        options = {'num_envs': num_envs, 'num_players': num_players, 'max_turns': max_turns, 'seed': seed}
+
+        self.memories: List[SharedMemory] = []
+        self.pipes = []
+        self.processes: List[Process] = []
+        self.arrays: Dict[str, np.ndarray] = {}
+        buffers = {}
+        for name, (dtype, width) in BUFFERS.items():
+            shape = (num_envs,) if width is None else (num_envs, self.widths[width])
+            if self.num_workers == 0:
+                self.arrays[name] = np.zeros(shape, dtype=dtype)
+                continue
+            memory = SharedMemory(create=True, size=int(np.prod(shape)) * np.dtype(dtype).itemsize)
+            self.memories.append(memory)
+            self.arrays[name] = np.ndarray(shape, dtype=dtype, buffer=memory.buf)
+            self.arrays[name][:] = 0
+            buffers[name] = (memory.name, dtype, shape)
+
+        self._local = None
+        if self.num_workers == 0:
+            self._local = _Envs(self.arrays, 0, num_envs, **options)
+        for worker in range(self.num_workers):
+            start = worker * num_envs // self.num_workers
+            stop = (worker + 1) * num_envs // self.num_workers
+            pipe, worker_pipe = Pipe()
+            process = Process(target=_run_worker, args=(worker_pipe, buffers, start, stop, options), daemon=True)
+            process.start()
+            worker_pipe.close()
+            self.pipes.append(pipe)
+            self.processes.append(process)
+
+    def _run(self, operation: str):
+        if self._local is not None:
+            getattr(self._local, operation)()
+            return
+        for pipe in self.pipes:
+            pipe.send(operation)
+        for pipe in self.pipes:
+            pipe.recv()
+
+    def _info(self) -> Dict[str, np.ndarray]:
+        return {name: self.arrays[name] for name in ('legal', 'seat', 'winner', 'final_obs')}
+
+    def reset(self) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        self._run('reset')
+        return self.arrays['obs'], self._info()
+
+    def step(self, actions) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, Dict[str, np.ndarray]]:
+        self.arrays['action'][:] = actions
+        self._run('step')
+        arrays = self.arrays
+        return arrays['obs'], arrays['reward'], arrays['terminated'], arrays['truncated'], self._info()
+
+    def close(self):
+        for pipe in self.pipes:
+            try:
+                pipe.send('close')
+            except OSError:
+                pass
+        for process in self.processes:
+            process.join()
+        self.pipes, self.processes = [], []
+        self.arrays = {}
+        for memory in self.memories:
+            memory.close()
+            memory.unlink()
+        self.memories = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def random_actions(legal: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    '''
+    A uniformly drawn legal action per environment
+    '''
+    return np.argmax(rng.random(legal.shape) * legal, axis=1)
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Step random legal actions in a VectorEnv and report the throughput')
+    parser.add_argument('--envs', type=int, default=256)
+    parser.add_argument('--players', type=int, default=2)
+    parser.add_argument('--workers', type=int, default=cpu_count())
+    parser.add_argument('--steps', type=int, default=200)
+    parser.add_argument('--max-turns', type=int, default=1000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    with VectorEnv(args.envs, args.players, args.workers, args.max_turns) as env:
+        obs, info = env.reset()
+        games = 0
+        start = time.perf_counter()
+        for _ in range(args.steps):
+            obs, reward, terminated, truncated, info = env.step(random_actions(info['legal'], rng))
+            games += int(terminated.sum() + truncated.sum())
+        elapsed = time.perf_counter() - start
+    print(f'{args.envs} envs on {args.workers} workers: {args.envs * args.steps / elapsed:.0f} steps/s, '
+          f'{games} games finished')
@@ -0,0 +1,51 @@
+import struct
+from typing import Dict
+
+from action import pack_actions, parse_actions
+
+
+__all__ = [
+    'PROTOCOL_BINARY', 'PROTOCOL_JSON', 'PROTOCOL_LINES', 'PROTOCOLS', 'pack_turn'
+]
+
+PROTOCOL_JSON = 'json'
+PROTOCOL_BINARY = 'binary'
+PROTOCOLS = (PROTOCOL_JSON, PROTOCOL_BINARY)
+# JSON lines on a raw TCP socket, see tcp.py
+PROTOCOL_LINES = 'lines'
+
+VERSION = 2
+# version, number of players, lane size, home size, turn, current player index, dices, number of legal actions,
+# then the length of the seat name the frame is sent to, which follows the header in UTF-8
+HEADER = struct.Struct('<BBBBIBBBHH')
+_bodies: Dict[tuple, struct.Struct] = {}
+
+
+def _body(num_players: int, lane_size: int, home_size: int, num_pieces: int) -> struct.Struct:
+    '''
+    route piece codes (int8), home piece indexes (int8), piece places (uint8), -1 marking an empty location
+    '''
+    key = (num_players, lane_size, home_size, num_pieces)
+    if key not in _bodies:
+        route_size = num_players * lane_size
+        _bodies[key] = struct.Struct(f'<{route_size}b{num_players * home_size}b{num_players * num_pieces}B')
+    return _bodies[key]
+
+
+def pack_turn(state, seat: str) -> bytes:
+    '''
+    Whole turn of seat followed by its legal actions as 2 byte action codes, decoded by client/wire.py
+    '''
+    current_index, turn, dices, route, homes, places = state.snapshot()
+    num_players = len(state.players)
+    home_size = len(state.homes[0])
+    dices = (list(dices) + [0, 0])[:2]
+    legal = state.legal_actions()
+    seat_name = seat.encode()
+
+    header = HEADER.pack(VERSION, num_players, state.PLAYER_LANE_SIZE, home_size,
+                         turn, current_index, dices[0], dices[1], len(legal), len(seat_name))
+    body = _body(num_players, state.PLAYER_LANE_SIZE, home_size, state.MAX_NUM_PIECE_PER_PLAYER)
+    home_cells = [index for home in homes for index in home]
+    actions = b''.join(pack_actions(parse_actions(action)) for action in legal)
+    return header + seat_name + body.pack(*route, *home_cells, *places) + actions